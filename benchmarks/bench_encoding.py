@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+"""
+Compares the cost and the size of the two ways of sending API call parameters: URL-encoded
+in the query string of a GET request, or as a compact JSON body of a POST request.
+
+Encoding is timed up to the prepared HTTP request, without any network activity.
+
+    $ python benchmarks/bench_encoding.py [iterations]
+"""
+
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pytbo
+from pytbo.transport import JSON_HEADERS, encode_form, encode_json
+
+URL = 'https://api.telegram.org/bot123456:TOKEN/method'
+
+def keyboard_params(frozen=False):
+    rows = [ [ pytbo.KeyboardButton('Option %d.%d' % (r, c)) for c in range(4) ] for r in range(10) ]
+    params = {
+        'chat_id': 123456789,
+        'text': 'Choose one of the options below, please.',
+        'reply_markup': pytbo.ReplyKeyboardMarkup(rows, resize_keyboard=True)
+    }
+    if frozen:
+        params['reply_markup'] = params['reply_markup'].freeze()
+    return params
+
+def inline_params():
+    results = [
+        pytbo.InlineQueryResultArticle(
+            str(i),
+            'Result number %d' % (i),
+            pytbo.InputTextMessageContent('You picked result number %d' % (i)),
+            description='A short description of result number %d' % (i),
+            thumb_url='https://example.com/thumbs/%d.jpg' % (i))
+        for i in range(50)
+    ]
+    return {
+        'inline_query_id': '1234567890123456789',
+        'results': results,
+        'cache_time': 300,
+        'next_offset': '50'
+    }
+
+def prepare_get(params):
+    return requests.Request('GET', URL, params=encode_form(params)).prepare()
+
+def prepare_json(params):
+    return requests.Request('POST', URL, data=encode_json(params).encode('utf-8'), headers=JSON_HEADERS).prepare()
+
+def bench(label, iterations, func, params):
+    start = time.perf_counter()
+    for i in range(iterations):
+        prepared = func(params)
+    elapsed = time.perf_counter() - start
+    size = len(prepared.url) + len(prepared.body or b'')
+    print("%-38s %8.2f us/request %8d bytes (url %d)" % (label, elapsed * 1e6 / iterations, size, len(prepared.url)))
+
+def main(iterations):
+    cases = (
+        ('40 buttons keyboard', keyboard_params()),
+        ('40 buttons frozen keyboard', keyboard_params(frozen=True)),
+        ('50 inline results', inline_params())
+    )
+    for name, params in cases:
+        bench("%s, GET query" % (name), iterations, prepare_get, params)
+        bench("%s, JSON body" % (name), iterations, prepare_json, params)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+"""
+Measures the overhead of pytbo itself, running BareBot against the in-process fake Bot API.
+
+The fake backend is timed alone first, so that its cost can be told apart from pytbo's one.
+
+    $ python benchmarks/bench_fake.py [calls]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pytbo
+from pytbo.fake import FakeBotApi, FakeTransport
+
+def bench(label, calls, func):
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    elapsed = time.perf_counter() - start
+    print("%-40s %10.0f calls/s %8.2f us/call" % (label, calls / elapsed, elapsed * 1e6 / calls))
+    return elapsed
+
+def main(calls):
+    api = FakeBotApi(history=1)
+    bot = pytbo.BareBot('TOKEN', transport=FakeTransport(api))
+    markup = pytbo.ReplyKeyboardMarkup([ [ pytbo.KeyboardButton('yes'), pytbo.KeyboardButton('no') ] ])
+
+    backend = bench("fake backend sendMessage", calls,
+        lambda i: api.handle('TOKEN', 'sendMessage', { 'chat_id': i + 1, 'text': 'hello' }))
+    total = bench("BareBot.sendMessage", calls,
+        lambda i: bot.sendMessage(i + 1, 'hello'))
+    print("%-40s %10.2f us/call" % ("pytbo overhead", (total - backend) * 1e6 / calls))
+    bench("BareBot.sendMessage with reply_markup", calls,
+        lambda i: bot.sendMessage(i + 1, 'hello', reply_markup=markup))
+    bench("BareBot.getUpdates (empty)", calls,
+        lambda i: bot.getUpdates(offset=i))
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
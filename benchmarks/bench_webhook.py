@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""
+Measures how many updates per second the webhook server acknowledges and hands to a handler,
+either queued for ``run()`` or served by ``serve()`` with a Reply in every response.
+
+Local clients post updates like Telegram does, one at a time on each of their keep-alive connections,
+from the same process and event loop as the server, so the result is a lower bound for a single core.
+
+    $ python benchmarks/bench_webhook.py [updates] [connections]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pytbo
+
+PATH = '/bot123456:TOKEN'
+
+def update_request(update_id):
+    body = json.dumps({
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'from': { 'id': 1234, 'first_name': 'User' },
+            'chat': { 'id': 1234, 'type': 'private', 'first_name': 'User' },
+            'date': 1480000000,
+            'text': 'hello number %d' % (update_id)
+        }
+    }).encode('utf-8')
+    head = 'POST %s HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n'
+    return (head % (PATH, len(body))).encode('ascii') + body
+
+async def client(port, requests):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for request in requests:
+        writer.write(request)
+        head = await reader.readuntil(b'\r\n\r\n')
+        if not head.startswith(b'HTTP/1.1 200'):
+            raise RuntimeError(head.decode('latin-1'))
+        length = int(head.lower().split(b'content-length:')[1].split(b'\r\n')[0])
+        if length:
+            await reader.readexactly(length)
+    writer.close()
+
+def echo(update):
+    return pytbo.Reply('sendMessage', update.message.chat.id, update.message.text)
+
+async def bench(label, updates, connections, serve):
+    requests = [ update_request(i) for i in range(updates) ]
+    handled = []
+    async with pytbo.WebhookServer('127.0.0.1', 0, PATH, max_queue=updates) as server:
+        if serve:
+            consumer = asyncio.ensure_future(server.serve(lambda update: handled.append(update) or echo(update), None))
+        else:
+            consumer = asyncio.ensure_future(server.run(lambda update: handled.append(update)))
+        start = time.perf_counter()
+        await asyncio.gather(*[ client(server.port, requests[i::connections]) for i in range(connections) ])
+        server.stop()
+        await consumer
+        elapsed = time.perf_counter() - start
+    print("%-24s %d updates on %d connections: %10.0f updates/s %8.2f us/update" % (
+        label, len(handled), connections, len(handled) / elapsed, elapsed * 1e6 / len(handled)))
+
+async def main(updates, connections):
+    await bench("queued for run()", updates, connections, False)
+    await bench("serve() with a Reply", updates, connections, True)
+
+if __name__ == '__main__':
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    connections = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    asyncio.run(main(updates, connections))
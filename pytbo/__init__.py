@@ -7,7 +7,14 @@ __author__    = 'Alessandro Costa'
 __license__   = 'Apache 2.0'
 __copyright__ = 'Copyright 2016 Alessandro Costa'
 
+from .aio import AsyncBareBot
 from .bare import BareBot
+from .dispatch import Dispatcher
+from .inline import InlineAnswerCache, InlinePager
+from .shard import ShardedExecutor
+from .supervisor import WebhookSupervisor
+from .upload import InputFile
+from .webhook import Reply, WebhookServer
 from .types import ( Audio, CallbackQuery, Chat, ChosenInlineResult, Contact, Document, File, ForceReply,
                      InlineKeyboardButton, InlineKeyboardMarkup, InlineQuery, InlineQueryResultArticle,
                      InlineQueryResultAudio, InlineQueryResultCachedAudio, InlineQueryResultCachedDocument,
@@ -18,4 +25,5 @@ from .types import ( Audio, CallbackQuery, Chat, ChosenInlineResult, Contact, Do
                      InlineQueryResultVideo, InlineQueryResultVoice, InputContactMessageContent,
                      InputLocationMessageContent, InputTextMessageContent, InputVenueMessageContent,
                      KeyboardButton, Location, Message, MessageEntity, PhotoSize, ReplyKeyboardHide,
-                     ReplyKeyboardMarkup, Sticker, Update, User, UserProfilePhotos, Venue, Video, Voice )
+                     ReplyKeyboardMarkup, ResponseParameters, Sticker, Update, User, UserProfilePhotos, Venue, Video,
+                     Voice )
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.aio
+~~~~~~~~~
+
+This module implements an asyncio Telegram Bot, which exposes the same Telegram Bots API methods as
+the bare bot as coroutines. Its default transport requires the optional ``aiohttp`` dependency
+(``pip install pytbo[async]``).
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import asyncio
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from .api import BaseBot
+from .cache import READ_METHODS, AsyncSingleFlight, call_key
+from .download import Destination, skip_prefix
+from .errors import ApiRequestError, ApiResponseError, BotNotFoundError, MalformedResponseError, NetworkError
+from .poll import AsyncPoller
+from .ratelimit import RATE_LIMITED_METHODS
+from .transport import JSON_HEADERS, TELEGRAM_API_URL, encode_form, encode_json, form_value, parse_response
+from .types import File
+from .upload import CHUNK_SIZE, as_input_file
+
+if aiohttp is not None:
+    class UploadPayload(aiohttp.payload.IOBasePayload):
+        """The aiohttp payload of an UploadStream, whose size is known, so that uploads get a Content-Length."""
+
+        @property
+        def size(self):
+            return len(self._value) - self._value.tell()
+
+class AsyncTransport(object):
+    """
+    The way an asynchronous bot performs Telegram Bot API calls.
+
+    It is the asyncio counterpart of Transport: ``request`` and ``close`` are coroutines.
+    """
+
+    async def request(self, token, method, params=None, files=None):
+        """Performs an API call and returns the response as a Python dict."""
+        raise NotImplementedError()
+
+    def download(self, token, file_path, offset=0):
+        """Returns an async iterator over the chunks of the file at ``file_path``, starting from ``offset``."""
+        raise NotImplementedError()
+
+    async def close(self):
+        """Releases the resources held by the transport."""
+        pass
+
+class AiohttpTransport(AsyncTransport):
+    """
+    A transport based on a pooled aiohttp ClientSession.
+
+    Parameters are sent as a compact JSON body, unless ``json_body`` is False, in which case they are
+    URL-encoded in the query string of a GET request. Calls uploading files always use multipart forms.
+    ``limit`` is the maximum number of simultaneous connections, ``limit_per_host`` the maximum number
+    of simultaneous connections to the same host (0 means no limit) and ``keepalive_timeout`` the number
+    of seconds an idle connection is kept alive. Files to upload are opened and read outside of the event loop.
+    """
+
+    def __init__(self,
+            base_url=TELEGRAM_API_URL,
+            json_body=True,
+            limit=100,
+            limit_per_host=0,
+            keepalive_timeout=15):
+        if aiohttp is None:
+            raise ImportError("AiohttpTransport requires aiohttp, install it with 'pip install pytbo[async]'")
+        self.base_url = base_url
+        self.json_body = json_body
+        self.session = None
+        self.__connector_options = {
+            'limit': limit,
+            'limit_per_host': limit_per_host,
+            'keepalive_timeout': keepalive_timeout
+        }
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def __get_session(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(**self.__connector_options)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    def url_for(self, token, method):
+        return "%s/bot%s/%s" % (self.base_url, token, method)
+
+    def file_url_for(self, token, file_path):
+        return "%s/file/bot%s/%s" % (self.base_url, token, file_path)
+
+    async def download(self, token, file_path, offset=0):
+        headers = { 'Range': 'bytes=%d-' % (offset) } if offset else None
+        try:
+            async with self.__get_session().get(self.file_url_for(token, file_path), headers=headers) as r:
+                if r.status == 416:
+                    return
+                if r.status >= 400:
+                    raise ApiResponseError('downloadFile', r.status, 'HTTP error %d' % (r.status))
+                skip = offset if r.status != 206 else 0
+                async for chunk in r.content.iter_chunked(CHUNK_SIZE):
+                    if skip:
+                        chunk, skip = skip_prefix(chunk, skip)
+                    if chunk:
+                        yield chunk
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise NetworkError('downloadFile', e)
+
+    async def request(self, token, method, params=None, files=None):
+        try:
+            return await self.__request(token, method, params, files)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise NetworkError(method, e)
+
+    async def __request(self, token, method, params, files):
+        session = self.__get_session()
+        url = self.url_for(token, method)
+        if not files:
+            if not params:
+                r = await session.get(url)
+            elif self.json_body:
+                r = await session.post(url, data=encode_json(params).encode('utf-8'), headers=JSON_HEADERS)
+            else:
+                r = await session.get(url, params=encode_form(params))
+            async with r:
+                text = await r.text()
+            return parse_response(text, method, r.status)
+        loop = asyncio.get_event_loop()
+        form = aiohttp.FormData()
+        for k, v in params.items():
+            form.add_field(k, form_value(v))
+        streams = []
+        try:
+            for name, value in files.items():
+                input_file = as_input_file(value)
+                stream = await loop.run_in_executor(None, input_file.open)
+                streams.append(stream)
+                form.add_field(name, UploadPayload(stream, filename=input_file.filename,
+                    content_type=input_file.mime_type), filename=input_file.filename, content_type=input_file.mime_type)
+            async with session.post(url, data=form) as r:
+                text = await r.text()
+        finally:
+            for stream in streams:
+                stream.close()
+        return parse_response(text, method, r.status)
+
+class AsyncBareBot(BaseBot):
+    """
+    A bare Telegram Bot for asyncio applications.
+
+    Every Telegram Bot API method of BareBot is available with the same parameters, return types and errors,
+    but it must be awaited. With the default AiohttpTransport requests share a pooled session, so a single
+    event loop can keep many of them in flight at the same time.
+
+    The bot must be initialized before use, either awaiting ``initialize()`` or with ``async with``.
+    """
+
+    def __init__(self,
+            token,
+            transport=None,
+            limit=100,
+            limit_per_host=0,
+            keepalive_timeout=15,
+            rate_limiter=None,
+            retry_policy=None,
+            upload_cache=None,
+            response_cache=None,
+            coalesce_reads=True):
+        """
+        Creates the bot. No request is made until ``initialize()`` is awaited.
+
+        ``transport`` replaces the default AiohttpTransport, in which case the connection options are ignored.
+        ``limit`` is the maximum number of simultaneous connections, ``limit_per_host`` the maximum number
+        of simultaneous connections to the same host (0 means no limit) and ``keepalive_timeout`` the number
+        of seconds an idle connection is kept alive.
+        ``rate_limiter``, if given, holds the send methods until the Telegram limits allow them.
+        ``retry_policy``, if given, decides which failed calls are repeated and when.
+        ``upload_cache``, if given, is an UploadCache used to send the files already uploaded by their file_id.
+        Files are hashed outside of the event loop.
+        ``response_cache``, if given, is a ResponseCache keeping the results of ``getFile`` and ``getUserProfilePhotos``.
+        ``coalesce_reads`` makes identical read calls (``getMe``, ``getFile``, ``getUserProfilePhotos``) running
+        at the same time share a single request.
+        """
+
+        if transport is None:
+            transport = AiohttpTransport(limit=limit, limit_per_host=limit_per_host, keepalive_timeout=keepalive_timeout)
+        self.token = token
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.upload_cache = upload_cache
+        self.response_cache = response_cache
+        self.in_flight = AsyncSingleFlight() if coalesce_reads else None
+        self.id = None
+        self.username = None
+
+    async def __aenter__(self):
+        await self.initialize()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def initialize(self):
+        """Checks the bot token calling ``getMe`` and loads the bot information."""
+        try:
+            bot_user = await self.getMe()
+        except MalformedResponseError:
+            await self.close()
+            raise BotNotFoundError()
+        except:
+            await self.close()
+            raise
+        self.id = bot_user.id
+        self.username = bot_user.username
+
+    async def close(self):
+        """Closes the transport and all its pooled connections."""
+        await self.transport.close()
+
+    def poll(self, timeout=30, limit=None, offset=None, retry_policy=None, prefetch=False):
+        """
+        Returns an AsyncPoller receiving the updates of the bot with long polling:
+
+            async for update in bot.poll():
+                await handle(update)
+        """
+
+        return AsyncPoller(self, timeout, limit, offset, retry_policy, prefetch)
+
+    async def downloadChunks(self, file, offset=0):
+        """The asynchronous iterator counterpart of ``BareBot.downloadChunks``."""
+        if not isinstance(file, File) or file.file_path is None:
+            file = await self.getFile(file.file_id if isinstance(file, File) else file)
+        if file.file_path is None:
+            raise ApiRequestError("'%s' cannot be downloaded" % (file.file_id))
+        policy = self.retry_policy
+        if policy is not None:
+            policy.record_call('downloadFile')
+        attempt = 0
+        renewed = False
+        while True:
+            try:
+                async for chunk in self.transport.download(self.token, file.file_path, offset):
+                    offset += len(chunk)
+                    yield chunk
+                return
+            except (ApiResponseError, NetworkError) as e:
+                if isinstance(e, ApiResponseError) and e.error_code == 404 and not renewed:
+                    if self.response_cache is not None:
+                        self.response_cache.discard('getFile', { 'file_id': file.file_id })
+                    file = await self.getFile(file.file_id)
+                    renewed = True
+                    continue
+                delay = None if policy is None else policy.retry_delay('downloadFile', attempt, e)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def downloadFile(self, file, dest, resume=True):
+        """The counterpart of ``BareBot.downloadFile``. The destination is opened and written outside of the event loop."""
+        loop = asyncio.get_event_loop()
+        out = await loop.run_in_executor(None, Destination, dest, resume)
+        completed = False
+        try:
+            async for chunk in self.downloadChunks(file, out.offset):
+                await loop.run_in_executor(None, out.write, chunk)
+            completed = True
+        finally:
+            await loop.run_in_executor(None, out.close, completed)
+        return out.offset
+
+    async def _call(self, method, params=None, files=None, decode=None):
+        if method in READ_METHODS:
+            result = await self.__read(method, params)
+            return result if decode is None else decode(result)
+        if files:
+            files = dict((field, as_input_file(value)) for field, value in files.items())
+        cache = self.upload_cache
+        if not files or cache is None:
+            return await self.__call(method, params, files, decode)
+        loop = asyncio.get_event_loop()
+        cached_params, cached_files, uploads, hits = await loop.run_in_executor(None, cache.resolve, params, files)
+        try:
+            return await self.__call(method, cached_params, cached_files, decode, uploads)
+        except ApiResponseError as e:
+            if not hits or e.error_code != 400:
+                raise
+        cache.discard(hits.values())
+        return await self.__call(method, params, files, decode, dict(uploads, **hits))
+
+    async def __read(self, method, params):
+        key = call_key(method, params)
+        if self.response_cache is not None:
+            result = self.response_cache.get(method, key)
+            if result is not None:
+                return result
+        if self.in_flight is None:
+            return await self.__fetch(method, params, key)
+        return await self.in_flight.do(key, lambda: self.__fetch(method, params, key))
+
+    async def __fetch(self, method, params, key):
+        result = await self.__call(method, params, None, None)
+        if self.response_cache is not None:
+            self.response_cache.put(method, key, result)
+        return result
+
+    async def __call(self, method, params, files, decode, uploads=None):
+        policy = self.retry_policy
+        if policy is not None:
+            policy.record_call(method)
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None and method in RATE_LIMITED_METHODS:
+                await self.rate_limiter.acquire_async(params['chat_id'])
+            try:
+                rdata = await self.transport.request(self.token, method, params, files)
+                return self._handle_response(rdata, method, decode, uploads)
+            except (ApiResponseError, NetworkError) as e:
+                delay = None if policy is None else policy.retry_delay(method, attempt, e)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
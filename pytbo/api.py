@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.api
+~~~~~~~~~
+
+This module implements the Telegram Bots API methods shared by the synchronous and asynchronous bots.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+from .errors import ApiResponseError, MalformedResponseError
+from .methods import api_methods
+from .prepared import PreparedCall
+from .types import ResponseParameters, opt_plain_param
+
+@api_methods
+class BaseBot(object):
+    """
+    Telegram Bot API methods shared by the synchronous and asynchronous bots.
+
+    Every method builds its parameters and hands them to ``_call``, which performs the request through
+    the bot transport and decodes the result. Parameters holding Telegram types, like ``reply_markup``,
+    are kept as objects and serialized by the transport. ``_call`` is implemented by subclasses, so the same methods
+    return plain values in BareBot and awaitables in AsyncBareBot.
+
+    Files to upload, like ``photo_file``, can be given as InputFile objects, or as paths, binary file objects
+    and buffers (bytes, memoryviews, mmaps) to build them from.
+    """
+
+    rate_limiter = None
+    retry_policy = None
+    upload_cache = None
+    response_cache = None
+
+    def prepare(self, method, **params):
+        """
+        Returns a PreparedCall of the given API method, by name, with the given parameters, to be called
+        with the ones changing from call to call, like ``chat_id``:
+
+            welcome = bot.prepare('sendMessage', text='Welcome!', reply_markup=keyboard)
+            for chat_id in new_users:
+                welcome(chat_id)
+        """
+
+        return PreparedCall(self, method, params)
+
+    def _call(self, method, params=None, files=None, decode=None):
+        raise NotImplementedError()
+
+    def _handle_response(self, rdata, method, decode=None, uploads=None):
+        if not isinstance(rdata, dict) or 'ok' not in rdata:
+            raise MalformedResponseError("'%s' returned a malformed JSON" % (method))
+        if not rdata['ok']:
+            raise ApiResponseError(method, rdata['error_code'], rdata['description'],
+                opt_plain_param('parameters', rdata, ResponseParameters))
+        if 'result' not in rdata:
+            raise MalformedResponseError("'%s' returned a malformed JSON" % (method))
+        result = rdata['result']
+        if self.rate_limiter is not None and isinstance(result, dict) and 'chat' in result:
+            self.rate_limiter.register_chat(result['chat'])
+        if uploads:
+            self.upload_cache.record(result, uploads)
+        return result if decode is None else decode(result)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.batch
+~~~~~~~~~~~
+
+This module implements batches of Telegram Bots API calls executed concurrently.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import concurrent.futures
+
+class Batch(object):
+    """
+    A group of API calls running concurrently on the bot thread pool.
+
+    Every API method of the bot is available on the batch with the same parameters, but it returns
+    a ``concurrent.futures.Future`` instead of waiting for the result. Leaving the ``with`` block waits
+    for all the calls to complete; results and errors are then collected in submission order.
+
+        with bot.batch() as batch:
+            for chat_id in chat_ids:
+                batch.sendMessage(chat_id, 'Hello!')
+        messages = batch.results()
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.wait()
+
+    def __len__(self):
+        return len(self.futures)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or not callable(getattr(self.bot, name, None)):
+            raise AttributeError(name)
+        def submit(*args, **kwargs):
+            return self.submit(name, *args, **kwargs)
+        return submit
+
+    def submit(self, method, *args, **kwargs):
+        """Schedules a call of the given bot method and returns its Future."""
+        future = self.bot.submit(method, *args, **kwargs)
+        self.futures.append(future)
+        return future
+
+    def wait(self, timeout=None):
+        """Waits for all the calls submitted so far to complete."""
+        concurrent.futures.wait(self.futures, timeout)
+
+    def results(self, timeout=None, return_exceptions=True):
+        """
+        Returns the results of the calls in submission order, waiting for them to complete.
+        A failed call contributes its exception, unless ``return_exceptions`` is False, in which case
+        the first error is raised.
+        """
+
+        self.wait(timeout)
+        results = []
+        for future in self.futures:
+            error = future.exception(timeout)
+            if error is None:
+                results.append(future.result())
+            elif return_exceptions:
+                results.append(error)
+            else:
+                raise error
+        return results
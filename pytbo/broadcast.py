@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.broadcast
+~~~~~~~~~~~~~~~
+
+This module implements the delivery of the same message to many chats.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import collections
+import concurrent.futures
+import os
+import threading
+import time
+
+from .errors import ApiResponseError, BotApiError
+from .methods import METHODS
+from .ratelimit import RateLimiter
+from .upload import as_input_file
+
+SENT = 'sent'
+BLOCKED = 'blocked'
+NOT_FOUND = 'not_found'
+FAILED = 'failed'
+
+MAX_FLOOD_WAITS = 5
+
+def classify(error):
+    """Tells why a message could not be delivered: BLOCKED, NOT_FOUND or FAILED."""
+    if isinstance(error, ApiResponseError):
+        if error.error_code == 403:
+            return BLOCKED
+        if error.error_code == 400 and 'chat not found' in error.description.lower():
+            return NOT_FOUND
+    return FAILED
+
+class BroadcastResult(object):
+    """The outcome of a broadcast for a single chat: its ``status``, and the ``result`` or the ``error`` of the call."""
+
+    def __init__(self, chat_id, status, result=None, error=None):
+        self.chat_id = chat_id
+        self.status = status
+        self.result = result
+        self.error = error
+
+    def __repr__(self):
+        return 'BroadcastResult(%r, %r)' % (self.chat_id, self.status)
+
+class Broadcast(object):
+    """
+    Calls the same send method, with the same parameters, for many chats.
+
+    Iterating over a broadcast runs it, yielding a BroadcastResult for every chat as soon as its call
+    completes. At most ``workers`` calls run at the same time on the bot thread pool, paced by the bot
+    RateLimiter or, if the bot has none, by the global limit of a default one for this broadcast. Flood control
+    errors pause the whole broadcast for the time required by Telegram, groups migrated to supergroups are
+    followed, and any other error is reported in the result of its chat without stopping the others.
+    The call is prepared once, so the parameters shared by all the chats are only encoded once.
+
+    If ``checkpoint`` is given, the chats whose call is over are appended to that file, and the chats
+    already found in it are skipped: an interrupted broadcast is resumed running it again with the same
+    checkpoint. Chats that FAILED, e.g. because of network errors, are not recorded, so they are retried.
+    A file sent by upload is sent to one chat at a time, from the same start, until it is delivered once,
+    the other chats receive its file_id.
+
+    ``throughput`` and ``eta`` can be read at any time while the broadcast is running.
+    """
+
+    def __init__(self, bot, chat_ids, method, params, workers=None, checkpoint=None, total=None,
+            max_retry_after=300):
+        self.bot = bot
+        self.chat_ids = chat_ids
+        self.method = method
+        self.params = dict(params)
+        self.workers = bot.max_workers if workers is None else workers
+        self.checkpoint = checkpoint
+        self.total = total if total is not None or not hasattr(chat_ids, '__len__') else len(chat_ids)
+        self.max_retry_after = max_retry_after
+        self.rate_limiter = None if bot.rate_limiter is not None else RateLimiter()
+        self.counts = collections.Counter()
+        self.skipped = 0
+        self.started = None
+        self.finished = None
+        self.__completed = set()
+        self.__times = collections.deque(maxlen=1000)
+        self.__paused_until = 0
+        self.__stopped = threading.Event()
+        for field in self.__file_fields():
+            if self.params.get('%s_file' % (field)) is not None:
+                self.params['%s_file' % (field)] = as_input_file(self.params['%s_file' % (field)])
+        self.__call = bot.prepare(method, **self.params)
+        if checkpoint is not None and os.path.exists(checkpoint):
+            with open(checkpoint, 'r') as f:
+                for line in f:
+                    self.__completed.add(line.split('\t', 1)[0])
+
+    @property
+    def done(self):
+        """The number of chats whose call is over."""
+        return sum(self.counts.values())
+
+    @property
+    def throughput(self):
+        """Calls completed per second, over the last ones."""
+        if len(self.__times) < 2 or self.__times[-1] == self.__times[0]:
+            return 0.0
+        return (len(self.__times) - 1) / (self.__times[-1] - self.__times[0])
+
+    @property
+    def eta(self):
+        """Estimated seconds to the end of the broadcast, or None if they are not known."""
+        throughput = self.throughput
+        if self.total is None or not throughput:
+            return None
+        return max(0, self.total - self.skipped - self.done) / throughput
+
+    def stats(self):
+        """Returns the progress of the broadcast as a dict."""
+        elapsed = 0 if self.started is None else (self.finished or time.monotonic()) - self.started
+        return {
+            'total': self.total,
+            'skipped': self.skipped,
+            'done': self.done,
+            'sent': self.counts[SENT],
+            'blocked': self.counts[BLOCKED],
+            'not_found': self.counts[NOT_FOUND],
+            'failed': self.counts[FAILED],
+            'elapsed': elapsed,
+            'throughput': self.throughput,
+            'eta': self.eta
+        }
+
+    def stop(self):
+        """Stops sending new calls. The calls already running complete and are reported."""
+        self.__stopped.set()
+
+    def run(self):
+        """Runs the whole broadcast, discarding the results, and returns its ``stats()``."""
+        for result in self:
+            pass
+        return self.stats()
+
+    def __iter__(self):
+        self.started = time.monotonic()
+        checkpoint = None if self.checkpoint is None else open(self.checkpoint, 'a')
+        pending = set()
+        try:
+            chat_ids = iter(self.chat_ids)
+            while self.__uploading() and not self.__stopped.is_set():
+                chat_id = next(chat_ids, None)
+                if chat_id is None:
+                    break
+                if not self.__skip(chat_id):
+                    self.__pace(chat_id)
+                    result = self.__send(chat_id)
+                    self.__reuse_file(result)
+                    yield self.__record(result, checkpoint)
+            for chat_id in chat_ids:
+                if self.__stopped.is_set():
+                    break
+                if self.__skip(chat_id):
+                    continue
+                while len(pending) >= self.workers:
+                    done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                    results = [ self.__record(future.result(), checkpoint) for future in done ]
+                    for result in results:
+                        yield result
+                self.__pace(chat_id)
+                pending.add(self.bot.submit(self.__send, chat_id))
+            for future in concurrent.futures.as_completed(pending):
+                pending.discard(future)
+                yield self.__record(future.result(), checkpoint)
+        finally:
+            for future in pending:
+                self.__record(future.result(), checkpoint)
+            if checkpoint is not None:
+                checkpoint.close()
+            self.finished = time.monotonic()
+
+    def __file_fields(self):
+        spec = METHODS.get(self.method)
+        return [] if spec is None else spec.files
+
+    def __uploading(self):
+        return any(self.params.get('%s_file' % (field)) is not None for field in self.__file_fields())
+
+    def __reuse_file(self, result):
+        for field in self.__file_fields():
+            media = None if result.status != SENT else getattr(result.result, field, None)
+            if isinstance(media, list):
+                media = media[-1] if media else None
+            if media is not None and self.params.get('%s_file' % (field)) is not None:
+                del self.params['%s_file' % (field)]
+                self.params['%s_id' % (field)] = media.file_id
+                self.__call = self.bot.prepare(self.method, **self.params)
+
+    def __skip(self, chat_id):
+        if self.__completed and str(chat_id) in self.__completed:
+            self.skipped += 1
+            return True
+        return False
+
+    def __pace(self, chat_id):
+        delay = self.__paused_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+    def __record(self, result, checkpoint):
+        self.counts[result.status] += 1
+        self.__times.append(time.monotonic())
+        if checkpoint is not None and result.status != FAILED:
+            checkpoint.write('%s\t%s\n' % (result.chat_id, result.status))
+            checkpoint.flush()
+        return result
+
+    def __send(self, chat_id):
+        call = self.__call
+        target = chat_id
+        flood_waits = 0
+        while True:
+            try:
+                return BroadcastResult(chat_id, SENT, call(target))
+            except ApiResponseError as e:
+                if (e.error_code == 429 and e.retry_after is not None and e.retry_after <= self.max_retry_after
+                        and flood_waits < MAX_FLOOD_WAITS):
+                    flood_waits += 1
+                    self.__paused_until = max(self.__paused_until, time.monotonic() + e.retry_after)
+                    time.sleep(e.retry_after)
+                    continue
+                if e.migrate_to_chat_id is not None and target == chat_id:
+                    target = e.migrate_to_chat_id
+                    continue
+                return BroadcastResult(chat_id, classify(e), error=e)
+            except BotApiError as e:
+                return BroadcastResult(chat_id, FAILED, error=e)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.cache
+~~~~~~~~~~~
+
+This module implements the caches used by the bots to avoid repeating Telegram Bots API calls.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import asyncio
+import collections
+import concurrent.futures
+import threading
+import time
+
+from .methods import API_METHODS
+
+READ_METHODS = frozenset(m.endpoint for m in API_METHODS if m.read)
+
+FILE_LINK_TTL = 3600
+
+def call_key(method, params):
+    """Returns a hashable key identifying an API call with plain parameters."""
+    return (method, tuple(sorted(params.items())) if params else ())
+
+class TTLCache(object):
+    """
+    A thread-safe cache whose entries expire ``ttl`` seconds after being stored (never, if it is None).
+    It holds at most ``max_size`` entries, evicting the least recently used ones first, and counts its
+    hits, misses and evictions.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__entries = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @property
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / float(lookups) if lookups else 0.0
+
+    def get(self, key, default=None):
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] is not None and entry[0] <= self.clock():
+                del self.__entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.__entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value, ttl=None):
+        """Stores a value, which expires after ``ttl`` seconds instead of the cache default one, if given."""
+        ttl = self.ttl if ttl is None else ttl
+        with self.__lock:
+            self.__entries[key] = (None if ttl is None else self.clock() + ttl, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self):
+        return {
+            'size': len(self.__entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': self.hit_ratio
+        }
+
+class ResponseCache(object):
+    """
+    Keeps the results of the API calls returning data that rarely changes, keyed by the call parameters.
+
+    ``getFile`` results are kept for ``file_ttl`` seconds, which cannot exceed the one hour for which
+    Telegram guarantees the file links, and ``getUserProfilePhotos`` results, for every user, offset and
+    limit, for ``profile_photos_ttl`` seconds. A TTL of 0 disables the cache of that method. Every method
+    has its own TTLCache of at most ``max_size`` entries.
+    """
+
+    def __init__(self, file_ttl=3000, profile_photos_ttl=600, max_size=1024):
+        ttls = {
+            'getFile': min(file_ttl, FILE_LINK_TTL),
+            'getUserProfilePhotos': profile_photos_ttl
+        }
+        self.caches = dict((method, TTLCache(max_size, ttl)) for method, ttl in ttls.items() if ttl > 0)
+
+    def get(self, method, key):
+        """Returns the cached result of a call, given its ``call_key``, or None."""
+        cache = self.caches.get(method)
+        return None if cache is None else cache.get(key)
+
+    def put(self, method, key, result):
+        cache = self.caches.get(method)
+        if cache is not None:
+            cache.put(key, result)
+
+    def discard(self, method, params):
+        """Forgets the result of a call, e.g. because the file link it returned expired."""
+        cache = self.caches.get(method)
+        if cache is not None:
+            cache.discard(call_key(method, params))
+
+    def stats(self):
+        """Returns the statistics of the cache of every method."""
+        return dict((method, cache.stats()) for method, cache in self.caches.items())
+
+class SingleFlight(object):
+    """
+    Joins identical calls made concurrently by different threads: while a call with a given key is running,
+    the other callers wait for it and share its result, or its error, instead of repeating it.
+    ``joined`` counts the calls that were saved.
+    """
+
+    def __init__(self):
+        self.joined = 0
+        self.__calls = {}
+        self.__lock = threading.Lock()
+
+    def do(self, key, func):
+        """Returns the result of ``func()``, or of the identical call already running."""
+        with self.__lock:
+            future = self.__calls.get(key)
+            if future is None:
+                future = self.__calls[key] = concurrent.futures.Future()
+                leader = True
+            else:
+                self.joined += 1
+                leader = False
+        if not leader:
+            return future.result()
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+        return result
+
+class AsyncSingleFlight(object):
+    """
+    The asyncio counterpart of SingleFlight, joining identical calls made concurrently by different tasks.
+    The shared call runs in a task of its own, so any of the waiting tasks, including the first one,
+    can be cancelled without affecting the others.
+    """
+
+    def __init__(self):
+        self.joined = 0
+        self.__calls = {}
+
+    async def do(self, key, func):
+        """Returns the result of ``await func()``, or of the identical call already running."""
+        task = self.__calls.get(key)
+        if task is None:
+            task = self.__calls[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda t: self.__done(key, t))
+        else:
+            self.joined += 1
+        return await asyncio.shield(task)
+
+    def __done(self, key, task):
+        if self.__calls.get(key) is task:
+            del self.__calls[key]
+        if not task.cancelled():
+            task.exception()
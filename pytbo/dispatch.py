@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.dispatch
+~~~~~~~~~~~~~~
+
+This module implements the routing of the updates to their handlers.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+from .shard import ShardedExecutor
+
+UPDATE_KINDS = ( 'message', 'inline_query', 'chosen_inline_result', 'callback_query' )
+
+CONTENT_KINDS = ( 'text', 'audio', 'document', 'photo', 'sticker', 'video', 'voice', 'contact', 'location',
+                  'venue', 'new_chat_member', 'left_chat_member', 'new_chat_title', 'new_chat_photo',
+                  'delete_chat_photo', 'group_chat_created', 'supergroup_chat_created', 'channel_chat_created',
+                  'migrate_to_chat_id', 'migrate_from_chat_id', 'pinned_message' )
+
+def update_kind(update):
+    """Returns the kind of the update, one of UPDATE_KINDS, or None if it is unknown."""
+    for kind in UPDATE_KINDS:
+        if getattr(update, kind) is not None:
+            return kind
+    return None
+
+def content_kind(message):
+    """Returns the kind of the content of the message, one of CONTENT_KINDS, or None if it is unknown."""
+    for kind in CONTENT_KINDS:
+        value = getattr(message, kind)
+        if value is not None and value is not False:
+            return kind
+    return None
+
+def entity_text(text, entity):
+    """
+    Returns the part of the text covered by the MessageEntity, whose offset and length are counted
+    by Telegram in UTF-16 code units, i.e. characters outside the BMP, like most emoji, count twice.
+    """
+
+    if text.isascii():
+        return text[entity.offset:entity.offset + entity.length]
+    units = text.encode('utf-16-le')
+    return units[entity.offset * 2:(entity.offset + entity.length) * 2].decode('utf-16-le')
+
+def parse_command(message):
+    """
+    Returns the command starting the text of the message as ``(command, username, args)``: the command
+    without the slash, lowercase, the username of the bot it is addressed to, if any, as in ``/start@MyBot``,
+    and the rest of the text, stripped. Returns None if the text does not start with a bot_command entity.
+    """
+
+    entities = message.entities
+    if not entities or message.text is None:
+        return None
+    for entity in entities:
+        if entity.type == 'bot_command' and entity.offset == 0:
+            command = entity_text(message.text, entity)
+            args = message.text[len(command):].strip()
+            command, _, username = command[1:].partition('@')
+            return command.lower(), username or None, args
+    return None
+
+class Dispatcher(object):
+    """
+    Routes every update to a single handler, looked up in hash tables, so that dispatching an update
+    costs the same however many handlers are registered.
+
+    The update is classified once: a message starting with a ``/command`` goes to the handler of the
+    command, if any; any other message goes to the handler of its content kind (``'text'``, ``'photo'``,
+    ``'location'``, ... see CONTENT_KINDS), if any; then every update goes to the handler of its kind
+    (``'message'``, ``'inline_query'``, ``'chosen_inline_result'`` or ``'callback_query'``), if any,
+    and finally to the default handler, if any. Commands addressed to another bot, as in ``/start@OtherBot``,
+    are not routed as commands; without ``username``, commands addressed to any bot are.
+
+    Handlers are registered with decorators, or passing them to the same methods, and registering a handler
+    again replaces the previous one:
+
+        dispatcher = pytbo.Dispatcher(bot.username)
+
+        @dispatcher.command('start')
+        def start(update):
+            bot.sendMessage(update.message.chat.id, 'Hello!')
+
+        dispatcher.message('photo', save_photo)
+
+        bot.poll().run(dispatcher)
+
+    Calling the dispatcher with an update calls its handler and returns what the handler returns, e.g.
+    a coroutine, for AsyncPoller and WebhookServer to await, or a Reply, or None if there is no handler.
+    Commands are parsed with ``parse_command()``, which handlers can call to read their arguments.
+    """
+
+    def __init__(self, username=None):
+        self.username = None if username is None else username.lower()
+        self.commands = {}
+        self.contents = {}
+        self.updates = {}
+        self.fallback = None
+
+    def command(self, name, handler=None):
+        """Registers the handler of the ``/name`` command; the name is case insensitive."""
+        return self.__register(self.commands, name.lstrip('/').lower(), handler)
+
+    def message(self, kind, handler=None):
+        """Registers the handler of the messages with content of the given kind, e.g. ``'text'``."""
+        if kind not in CONTENT_KINDS:
+            raise ValueError("'%s' is not a content kind" % (kind))
+        return self.__register(self.contents, kind, handler)
+
+    def update(self, kind, handler=None):
+        """Registers the handler of the updates of the given kind, e.g. ``'callback_query'``."""
+        if kind not in UPDATE_KINDS:
+            raise ValueError("'%s' is not an update kind" % (kind))
+        return self.__register(self.updates, kind, handler)
+
+    def default(self, handler=None):
+        """Registers the handler of the updates without any other handler."""
+        if handler is None:
+            def decorator(handler):
+                self.fallback = handler
+                return handler
+            return decorator
+        self.fallback = handler
+        return handler
+
+    def route(self, update):
+        """Returns the handler of the update, or None if it has none."""
+        message = update.message
+        if message is not None:
+            if self.commands and message.entities:
+                command = parse_command(message)
+                if command is not None and (command[1] is None or self.username is None
+                        or command[1].lower() == self.username):
+                    handler = self.commands.get(command[0])
+                    if handler is not None:
+                        return handler
+            if self.contents:
+                handler = self.contents.get(content_kind(message))
+                if handler is not None:
+                    return handler
+            return self.updates.get('message', self.fallback)
+        return self.updates.get(update_kind(update), self.fallback)
+
+    def dispatch(self, update):
+        """Calls the handler of the update, returning its result, or None if the update has no handler."""
+        handler = self.route(update)
+        if handler is None:
+            return None
+        return handler(update)
+
+    __call__ = dispatch
+
+    def sharded(self, workers=8, max_queue=100, error_handler=None):
+        """
+        Returns a ShardedExecutor dispatching the updates on ``workers`` threads, in order for every chat:
+
+            with dispatcher.sharded(workers=16) as executor:
+                bot.poll().run(executor)
+        """
+
+        return ShardedExecutor(self, workers, max_queue, error_handler)
+
+    def __register(self, table, key, handler):
+        if handler is None:
+            def decorator(handler):
+                table[key] = handler
+                return handler
+            return decorator
+        table[key] = handler
+        return handler
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.download
+~~~~~~~~~~~~~~
+
+This module implements the destinations of the files downloaded from the Telegram Bots API.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import os
+
+from .errors import ApiRequestError
+
+def skip_prefix(chunk, skip):
+    """Drops the first ``skip`` bytes of a stream from one of its chunks, returning the rest and the bytes still to drop."""
+    if skip >= len(chunk):
+        return b'', skip - len(chunk)
+    return chunk[skip:], 0
+
+class Destination(object):
+    """
+    Where a downloaded file is written: a path, a binary file object or a writable buffer.
+
+    A path is written through a ``<path>.part`` file, renamed when the download completes, so that a file
+    is never mistaken for complete. If ``resume`` is set, the data already in the ``.part`` file of an
+    interrupted download is kept and the download continues from ``offset``. File objects and buffers
+    belong to the caller: they are written from their current position and from their start respectively.
+    """
+
+    def __init__(self, dest, resume=True):
+        self.dest = dest
+        self.offset = 0
+        self.__fileobj = None
+        self.__view = None
+        self.__part_path = None
+        if isinstance(dest, (str, os.PathLike)):
+            self.__part_path = '%s.part' % (os.fspath(dest))
+            if resume and os.path.exists(self.__part_path):
+                self.offset = os.path.getsize(self.__part_path)
+            self.__fileobj = open(self.__part_path, 'ab' if self.offset else 'wb')
+        elif hasattr(dest, 'write'):
+            self.__fileobj = dest
+        else:
+            view = memoryview(dest)
+            if view.readonly:
+                view.release()
+                raise ApiRequestError('the download destination is read-only')
+            self.__view = view.cast('B')
+
+    def write(self, chunk):
+        if self.__view is None:
+            self.__fileobj.write(chunk)
+        elif self.offset + len(chunk) > len(self.__view):
+            raise ApiRequestError('the file does not fit in the download buffer')
+        else:
+            self.__view[self.offset:self.offset + len(chunk)] = chunk
+        self.offset += len(chunk)
+
+    def close(self, completed=True):
+        """Releases the destination and, if the download is ``completed``, moves a ``.part`` file to its path."""
+        if self.__view is not None:
+            self.__view.release()
+        if self.__part_path is not None:
+            self.__fileobj.close()
+            if completed:
+                os.replace(self.__part_path, self.dest)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(exc_type is None)
@@ -21,11 +21,28 @@ class ApiRequestError(BotApiError):
     pass
 
 class ApiResponseError(BotApiError):
-    def __init__(self, method, error_code, description):
+    def __init__(self, method, error_code, description, parameters=None):
         super(ApiResponseError, self).__init__("[%s] [%s] %s" % (method, error_code, description))
         self.method = method
         self.error_code = error_code
         self.description = description
+        self.parameters = parameters
+
+    @property
+    def retry_after(self):
+        """Seconds to wait before repeating the request, if the error is due to flood control."""
+        return None if self.parameters is None else self.parameters.retry_after
+
+    @property
+    def migrate_to_chat_id(self):
+        """The new identifier of the chat, if the error is due to a group migrated to a supergroup."""
+        return None if self.parameters is None else self.parameters.migrate_to_chat_id
 
 class MalformedResponseError(BotApiError):
     pass
+
+class NetworkError(BotApiError):
+    def __init__(self, method, cause):
+        super(NetworkError, self).__init__("[%s] %s" % (method, cause))
+        self.method = method
+        self.cause = cause
@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.fake
+~~~~~~~~~~
+
+This module implements an in-process fake of the Telegram Bots API and the transports to use it,
+so that bots can be exercised and benchmarked offline, without sockets.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import asyncio
+import collections
+import itertools
+import threading
+import time
+
+from .aio import AsyncTransport
+from .errors import ApiResponseError
+from .transport import Transport
+from .upload import CHUNK_SIZE, as_input_file
+
+class FakeApiError(Exception):
+    def __init__(self, error_code, description, parameters=None):
+        super(FakeApiError, self).__init__("[%s] %s" % (error_code, description))
+        self.error_code = error_code
+        self.description = description
+        self.parameters = parameters
+
+    def to_dict(self):
+        obj_dict = {
+            'ok': False,
+            'error_code': self.error_code,
+            'description': self.description
+        }
+        if self.parameters is not None:
+            obj_dict['parameters'] = self.parameters
+        return obj_dict
+
+class FakeBotApi(object):
+    """
+    An in-memory implementation of the Telegram Bot API.
+
+    It answers API calls with responses shaped like the real ones, keeps the sent messages, the uploaded
+    files and the pending updates, and can be told to fail calls or to treat chats as blocked or unknown.
+    Chats are created on first use, private if their id is positive and groups otherwise, unless ``strict``
+    is set, in which case only chats registered with ``add_chat`` exist.
+    """
+
+    def __init__(self,
+            token=None,
+            bot_id=1,
+            first_name='Fake Bot',
+            username='fake_bot',
+            strict=False,
+            history=1000):
+        self.token = token
+        self.bot = {
+            'id': bot_id,
+            'first_name': first_name,
+            'username': username
+        }
+        self.strict = strict
+        self.chats = {}
+        self.blocked = set()
+        self.files = {}
+        self.profile_photos = {}
+        self.messages = collections.deque(maxlen=history)
+        self.calls = collections.Counter()
+        self.webhook_url = None
+        self.__updates = []
+        self.__update_ids = itertools.count(1)
+        self.__message_ids = itertools.count(1)
+        self.__file_ids = itertools.count(1)
+        self.__file_paths = {}
+        self.__failures = {}
+        self.__cond = threading.Condition()
+        self.__handlers = {
+            'getMe': self.__get_me,
+            'getUpdates': self.__get_updates,
+            'setWebhook': self.__set_webhook,
+            'sendMessage': self.__send_message,
+            'forwardMessage': self.__forward_message,
+            'sendPhoto': self.__send_photo,
+            'sendAudio': self.__send_audio,
+            'sendDocument': self.__send_document,
+            'sendSticker': self.__send_sticker,
+            'sendVideo': self.__send_video,
+            'sendVoice': self.__send_voice,
+            'sendLocation': self.__send_location,
+            'sendVenue': self.__send_venue,
+            'sendContact': self.__send_contact,
+            'sendChatAction': self.__chat_true,
+            'getUserProfilePhotos': self.__get_user_profile_photos,
+            'getFile': self.__get_file,
+            'kickChatMember': self.__chat_true,
+            'unbanChatMember': self.__chat_true,
+            'answerCallbackQuery': self.__true,
+            'editMessageText': self.__edit_message,
+            'editMessageCaption': self.__edit_message,
+            'editMessageReplyMarkup': self.__edit_message,
+            'answerInlineQuery': self.__true
+        }
+
+    def add_chat(self, id, type='private', **fields):
+        """Registers a chat, returning its dict representation."""
+        chat = dict(fields, id=id, type=type)
+        self.chats[id] = chat
+        return chat
+
+    def block(self, chat_id):
+        """Makes every call addressed to the given chat fail as if the user blocked the bot."""
+        self.blocked.add(chat_id)
+
+    def fail(self, method, error_code, description, times=1, parameters=None):
+        """Makes the next ``times`` calls of ``method`` fail with the given error."""
+        with self.__cond:
+            self.__failures.setdefault(method, collections.deque()).extend(
+                [ FakeApiError(error_code, description, parameters) ] * times)
+
+    def add_file(self, data, file_path=None):
+        """Stores a file as if it had been uploaded, returning its file_id."""
+        file_id = 'file%d' % (next(self.__file_ids))
+        if file_path is None:
+            file_path = 'documents/%s' % (file_id)
+        self.files[file_id] = {
+            'data': data,
+            'file_path': file_path
+        }
+        self.__file_paths[file_path] = file_id
+        return file_id
+
+    def file_content(self, token, file_path):
+        """Returns the content of the file stored at ``file_path``, as if downloaded from the file link."""
+        if self.token is not None and token != self.token:
+            raise ApiResponseError('downloadFile', 401, 'Unauthorized')
+        file_id = self.__file_paths.get(file_path)
+        if file_id is None:
+            raise ApiResponseError('downloadFile', 404, 'Not Found')
+        return self.files[file_id]['data']
+
+    def push_update(self, update):
+        """Queues an incoming update, given as an Update object or as a dict, and returns its update_id."""
+        obj_dict = update if isinstance(update, dict) else update.to_dict()
+        with self.__cond:
+            if 'update_id' not in obj_dict:
+                obj_dict = dict(obj_dict, update_id=next(self.__update_ids))
+            self.__updates.append(obj_dict)
+            self.__cond.notify_all()
+        return obj_dict['update_id']
+
+    def handle(self, token, method, params=None, files=None, wait=True):
+        """
+        Answers an API call with a dict shaped like the Telegram Bot API response.
+        ``wait`` tells whether getUpdates may block for its long polling timeout.
+        """
+
+        self.calls[method] += 1
+        params = {} if params is None else params
+        try:
+            if self.token is not None and token != self.token:
+                raise FakeApiError(401, 'Unauthorized')
+            handler = self.__handlers.get(method)
+            if handler is None:
+                raise FakeApiError(404, 'Not Found')
+            failures = self.__failures.get(method)
+            if failures:
+                with self.__cond:
+                    if failures:
+                        raise failures.popleft()
+            if method == 'getUpdates':
+                return { 'ok': True, 'result': handler(params, wait) }
+            return { 'ok': True, 'result': handler(params, files or {}) }
+        except FakeApiError as e:
+            return e.to_dict()
+        except KeyError as e:
+            return FakeApiError(400, 'Bad Request: %s is empty' % (e.args[0])).to_dict()
+
+    def __chat(self, chat_id):
+        try:
+            chat_id = int(chat_id)
+        except ValueError:
+            pass
+        if chat_id in self.blocked:
+            raise FakeApiError(403, 'Forbidden: bot was blocked by the user')
+        chat = self.chats.get(chat_id)
+        if chat is None:
+            if self.strict or not isinstance(chat_id, int):
+                raise FakeApiError(400, 'Bad Request: chat not found')
+            chat = self.add_chat(chat_id, 'private' if chat_id > 0 else 'group')
+        return chat
+
+    def __new_message(self, params, **content):
+        message = {
+            'message_id': next(self.__message_ids),
+            'date': int(time.time()),
+            'chat': self.__chat(params['chat_id']),
+            'from': self.bot
+        }
+        message.update(content)
+        self.messages.append(message)
+        return message
+
+    def __upload(self, params, files, field):
+        if field in files:
+            input_file = as_input_file(files[field])
+            with input_file.open() as stream:
+                data = stream.read()
+            file_id = self.add_file(data)
+            return file_id, len(data), input_file.filename
+        file_id = params[field]
+        stored = self.files.get(file_id)
+        return file_id, None if stored is None else len(stored['data']), None
+
+    def __media(self, params, files, field, **fields):
+        file_id, file_size, file_name = self.__upload(params, files, field)
+        media = dict((k, v) for k, v in fields.items() if v is not None)
+        media['file_id'] = file_id
+        if file_size is not None:
+            media['file_size'] = file_size
+        if file_name is not None and field == 'document':
+            media['file_name'] = file_name
+        return media
+
+    def __true(self, params, files):
+        return True
+
+    def __chat_true(self, params, files):
+        self.__chat(params['chat_id'])
+        return True
+
+    def __get_me(self, params, files):
+        return self.bot
+
+    def __get_updates(self, params, wait):
+        offset = int(params.get('offset', 0))
+        limit = int(params.get('limit', 100))
+        timeout = float(params.get('timeout', 0)) if wait else 0
+        deadline = time.time() + timeout
+        with self.__cond:
+            self.__updates = [ u for u in self.__updates if u['update_id'] >= offset ]
+            while not self.__updates and time.time() < deadline:
+                self.__cond.wait(deadline - time.time())
+            return self.__updates[:limit]
+
+    def __set_webhook(self, params, files):
+        self.webhook_url = params.get('url') or None
+        return True
+
+    def __send_message(self, params, files):
+        return self.__new_message(params, text=params['text'])
+
+    def __forward_message(self, params, files):
+        self.__chat(params['from_chat_id'])
+        return self.__new_message(params, forward_date=int(time.time()))
+
+    def __send_photo(self, params, files):
+        photo = self.__media(params, files, 'photo', width=90, height=90)
+        return self.__new_message(params, photo=[ photo ], caption=params.get('caption'))
+
+    def __send_audio(self, params, files):
+        audio = self.__media(params, files, 'audio', duration=int(params.get('duration', 0)),
+            performer=params.get('performer'), title=params.get('title'))
+        return self.__new_message(params, audio=audio)
+
+    def __send_document(self, params, files):
+        document = self.__media(params, files, 'document')
+        return self.__new_message(params, document=document, caption=params.get('caption'))
+
+    def __send_sticker(self, params, files):
+        sticker = self.__media(params, files, 'sticker', width=512, height=512)
+        return self.__new_message(params, sticker=sticker)
+
+    def __send_video(self, params, files):
+        video = self.__media(params, files, 'video', width=int(params.get('width', 0)),
+            height=int(params.get('height', 0)), duration=int(params.get('duration', 0)))
+        return self.__new_message(params, video=video, caption=params.get('caption'))
+
+    def __send_voice(self, params, files):
+        voice = self.__media(params, files, 'voice', duration=int(params.get('duration', 0)))
+        return self.__new_message(params, voice=voice)
+
+    def __send_location(self, params, files):
+        location = {
+            'latitude': params['latitude'],
+            'longitude': params['longitude']
+        }
+        return self.__new_message(params, location=location)
+
+    def __send_venue(self, params, files):
+        venue = {
+            'location': {
+                'latitude': params['latitude'],
+                'longitude': params['longitude']
+            },
+            'title': params['title'],
+            'address': params['address']
+        }
+        return self.__new_message(params, venue=venue)
+
+    def __send_contact(self, params, files):
+        contact = {
+            'phone_number': params['phone_number'],
+            'first_name': params['first_name']
+        }
+        return self.__new_message(params, contact=contact)
+
+    def __get_user_profile_photos(self, params, files):
+        photos = self.profile_photos.get(int(params['user_id']), [])
+        offset = int(params.get('offset', 0))
+        limit = int(params.get('limit', 100))
+        return {
+            'total_count': len(photos),
+            'photos': photos[offset:offset + limit]
+        }
+
+    def __get_file(self, params, files):
+        stored = self.files.get(params['file_id'])
+        if stored is None:
+            raise FakeApiError(400, 'Bad Request: invalid file id')
+        return {
+            'file_id': params['file_id'],
+            'file_size': len(stored['data']),
+            'file_path': stored['file_path']
+        }
+
+    def __edit_message(self, params, files):
+        if params.get('inline_message_id') is not None:
+            return True
+        message = {
+            'message_id': int(params['message_id']),
+            'date': int(time.time()),
+            'chat': self.__chat(params['chat_id']),
+            'from': self.bot
+        }
+        if 'text' in params:
+            message['text'] = params['text']
+        if 'caption' in params:
+            message['caption'] = params['caption']
+        return message
+
+class FakeTransport(Transport):
+    """A transport that answers API calls with a FakeBotApi, without any network activity."""
+
+    def __init__(self, api=None):
+        self.api = FakeBotApi() if api is None else api
+
+    def request(self, token, method, params=None, files=None):
+        return self.api.handle(token, method, params, files)
+
+    def download(self, token, file_path, offset=0):
+        data = memoryview(self.api.file_content(token, file_path))
+        for start in range(offset, len(data), CHUNK_SIZE):
+            yield bytes(data[start:start + CHUNK_SIZE])
+
+class AsyncFakeTransport(AsyncTransport):
+    """The asyncio counterpart of FakeTransport. Long polling never blocks the event loop."""
+
+    def __init__(self, api=None, poll_interval=0.01):
+        self.api = FakeBotApi() if api is None else api
+        self.poll_interval = poll_interval
+
+    async def request(self, token, method, params=None, files=None):
+        rdata = self.api.handle(token, method, params, files, wait=False)
+        if method == 'getUpdates' and rdata.get('result') == [] and params and params.get('timeout'):
+            deadline = time.time() + float(params['timeout'])
+            while rdata.get('result') == [] and time.time() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                rdata = self.api.handle(token, method, params, files, wait=False)
+        return rdata
+
+    async def download(self, token, file_path, offset=0):
+        data = memoryview(self.api.file_content(token, file_path))
+        for start in range(offset, len(data), CHUNK_SIZE):
+            yield bytes(data[start:start + CHUNK_SIZE])
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.inline
+~~~~~~~~~~~~
+
+This module implements the helpers for answering inline queries: caching and paging their results.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import binascii
+import itertools
+import os
+import threading
+
+from .cache import TTLCache
+from .transport import json_value
+
+class SerializedResults(object):
+    """
+    The results of an inline query answer, serialized once as a JSON array.
+    It can be given as the ``results`` of ``answerInlineQuery`` any number of times.
+    """
+
+    def __init__(self, results):
+        results = list(results)
+        self.count = len(results)
+        self.json = json_value(results)
+
+    def __len__(self):
+        return self.count
+
+    def to_json(self):
+        return self.json
+
+class InlineAnswerCache(object):
+    """
+    Keeps the serialized results of the inline queries answered by the bot, so that popular queries
+    are answered again without building and serializing their results.
+
+    Answers are keyed by the query text and offset, and by the user who sent the query if they are
+    personal. Each answer is kept for its ``cache_time``, like Telegram does, or for ``ttl`` seconds if
+    it is shorter, and at most ``max_size`` answers are kept, evicting the least recently used ones first.
+    """
+
+    def __init__(self, max_size=1024, ttl=None):
+        self.ttl = ttl
+        self.cache = TTLCache(max_size)
+
+    @property
+    def hit_ratio(self):
+        return self.cache.hit_ratio
+
+    def stats(self):
+        return self.cache.stats()
+
+    def key(self, inline_query, is_personal=False):
+        return (inline_query.query, inline_query.offset, inline_query.sender.id if is_personal else None)
+
+    def get(self, inline_query, is_personal=False):
+        """Returns the SerializedResults of the answer to the given InlineQuery, or None."""
+        return self.cache.get(self.key(inline_query, is_personal))
+
+    def put(self, inline_query, results, cache_time=300, is_personal=False):
+        """Stores the results of the answer to the given InlineQuery, returning them as SerializedResults."""
+        if not isinstance(results, SerializedResults):
+            results = SerializedResults(results)
+        ttl = cache_time if self.ttl is None else min(cache_time, self.ttl)
+        if ttl > 0:
+            self.cache.put(self.key(inline_query, is_personal), results, ttl)
+        return results
+
+    def answer(self, bot, inline_query, build, cache_time=300, is_personal=False, **params):
+        """
+        Answers the given InlineQuery with the cached results, or with the results returned by
+        ``build(inline_query)``, which are stored in the cache. The other ``params`` are passed to
+        ``answerInlineQuery`` as they are. Returns what ``bot.answerInlineQuery`` returns.
+        """
+
+        results = self.get(inline_query, is_personal)
+        if results is None:
+            results = self.put(inline_query, build(inline_query), cache_time, is_personal)
+        return bot.answerInlineQuery(inline_query.id, results, cache_time=cache_time,
+            is_personal=is_personal or None, **params)
+
+class InlineCursor(object):
+    """Where a paged inline query is in the iterator of its results, and the last page read from it."""
+
+    def __init__(self, key):
+        self.key = key
+        self.results = None
+        self.position = 0
+        self.lookahead = []
+        self.page = None
+        self.page_position = None
+        self.next_offset = ''
+        self.lock = threading.Lock()
+
+    def restart(self, results):
+        """Starts reading the given results from their beginning."""
+        self.results = iter(results)
+        self.position = 0
+        self.lookahead = []
+
+    def skip(self, count):
+        """Discards the next ``count`` results."""
+        if count and self.lookahead:
+            self.lookahead = []
+            self.position += 1
+            count -= 1
+        skipped = sum(1 for _ in itertools.islice(self.results, count))
+        self.position += skipped
+
+    def read(self, count):
+        """Returns the next ``count`` results, or the ones left if they are less."""
+        page = self.lookahead[:count]
+        self.lookahead = self.lookahead[count:]
+        page.extend(itertools.islice(self.results, count - len(page)))
+        self.position += len(page)
+        return page
+
+    def has_more(self):
+        """Tells whether there are more results, reading the next one ahead if needed."""
+        if not self.lookahead:
+            self.lookahead = list(itertools.islice(self.results, 1))
+        return bool(self.lookahead)
+
+class InlinePager(object):
+    """
+    Answers inline queries one page at a time, from an iterator over all their results, like a generator
+    or a database cursor, which is never materialized as a whole.
+
+    ``source(inline_query)`` returns the iterator of the results of a query. The first page of a query starts
+    a new iterator, and every page gives Telegram an opaque ``next_offset`` token to get the next one.
+    The iterators are kept in a cache of at most ``max_cursors`` entries, for ``ttl`` seconds since their
+    last use, so every page only reads its own results, and a page requested again is answered once more.
+    If a cursor was evicted the query is run again, skipping the results before the page, and ``restarts``
+    counts these cases.
+    """
+
+    def __init__(self, page_size=50, max_cursors=1024, ttl=300):
+        self.page_size = page_size
+        self.cursors = TTLCache(max_cursors, ttl)
+        self.restarts = 0
+
+    def page(self, inline_query, source):
+        """Returns the results of the page requested by the given InlineQuery and the ``next_offset`` token."""
+        key = (inline_query.query, inline_query.sender.id)
+        token, position = self.__parse(inline_query.offset)
+        cursor = None if token is None else self.cursors.get(token)
+        if cursor is None or cursor.key != key:
+            if cursor is not None or token is None:
+                token = binascii.hexlify(os.urandom(8)).decode('ascii')
+            cursor = InlineCursor(key)
+        with cursor.lock:
+            if cursor.page_position != position:
+                if cursor.results is None or position < cursor.position:
+                    if position:
+                        self.restarts += 1
+                    cursor.restart(source(inline_query))
+                if position > cursor.position:
+                    cursor.skip(position - cursor.position)
+                cursor.page = cursor.read(self.page_size)
+                cursor.page_position = position
+                if cursor.has_more():
+                    cursor.next_offset = '%s:%d' % (token, position + self.page_size)
+                else:
+                    cursor.next_offset = ''
+            self.cursors.put(token, cursor)
+            return cursor.page, cursor.next_offset
+
+    def answer(self, bot, inline_query, source, cache_time=300, is_personal=False, **params):
+        """
+        Answers the given InlineQuery with the page of results it requested. The other ``params`` are passed
+        to ``answerInlineQuery`` as they are. Returns what ``bot.answerInlineQuery`` returns.
+        """
+
+        results, next_offset = self.page(inline_query, source)
+        return bot.answerInlineQuery(inline_query.id, results, cache_time=cache_time,
+            is_personal=is_personal or None, next_offset=next_offset, **params)
+
+    def __parse(self, offset):
+        token, sep, position = offset.partition(':')
+        if not sep or not token or not position.isdigit():
+            return None, 0
+        return token, int(position)
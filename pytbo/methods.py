@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.methods
+~~~~~~~~~~~~~
+
+This module implements the table of the Telegram Bots API methods, from which the request encoders,
+the response decoders and the bot methods are built once at import time.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+from .errors import ApiRequestError
+from .types import File, Message, Update, User, UserProfilePhotos
+
+def array_of(return_class):
+    return lambda result: [ return_class.from_dict(obj) for obj in result ]
+
+def message_or_true(result):
+    return result if result is True else Message.from_dict(result)
+
+def list_or_json(value):
+    return value if hasattr(value, 'to_json') else list(value)
+
+class Param(object):
+    """
+    A parameter of an API method, sent as it is unless ``convert`` is given.
+    A name ending with ``=`` in the method table is a shortcut for an optional Param.
+    """
+
+    def __init__(self, name, required=True, convert=None):
+        self.name = name
+        self.required = required
+        self.convert = convert
+
+    @property
+    def args(self):
+        return [ self.name if self.required else '%s=None' % (self.name) ]
+
+class FileParam(object):
+    """
+    A file parameter of an API method, given either as the id of a file already on the Telegram servers,
+    with the ``<name>_id`` argument, or as a file to upload, with the ``<name>_file`` argument: an InputFile,
+    or a path, a binary file object or a buffer to build it from.
+    If ``upload_only`` is set, the file can only be uploaded and it is given with the ``<name>`` argument.
+    """
+
+    def __init__(self, name, upload_only=False):
+        self.name = name
+        self.upload_only = upload_only
+
+    @property
+    def args(self):
+        if self.upload_only:
+            return [ '%s=None' % (self.name) ]
+        return [ '%s_id=None' % (self.name), '%s_file=None' % (self.name) ]
+
+class ApiMethod(object):
+    """
+    The description of an API method: its parameters, in the order of the bot method arguments,
+    what it returns and how it can be treated by the bots.
+
+    ``returns`` is a Telegram type, a one-item list for an array of that type, True for methods
+    returning plain values, or a ``(Message, True)`` tuple for methods returning either.
+    ``endpoint`` is the Telegram method actually called, if it is not ``name``.
+    ``idempotent`` methods can be safely repeated after a network error, ``read`` ones have no side effects
+    at all, and ``rate_limited`` ones send messages to the chat given by their ``chat_id``.
+    """
+
+    def __init__(self, name, params, returns, doc=None, endpoint=None, idempotent=False, read=False,
+            rate_limited=False):
+        self.name = name
+        self.params = [ p if not isinstance(p, str) else Param(p.rstrip('='), not p.endswith('=')) for p in params ]
+        self.returns = returns
+        self.doc = doc
+        self.endpoint = name if endpoint is None else endpoint
+        self.idempotent = idempotent or read
+        self.read = read
+        self.rate_limited = rate_limited
+        self.files = [ p.name for p in self.params if isinstance(p, FileParam) ]
+        self.decode = self.__decoder()
+        self.encode = self.__compile('encode_%s' % (name), False)
+        self.method = self.__compile(name, True)
+
+    def __decoder(self):
+        if self.returns is True:
+            return None
+        if isinstance(self.returns, list):
+            return array_of(self.returns[0])
+        if isinstance(self.returns, tuple):
+            return message_or_true
+        return self.returns.from_dict
+
+    def __body(self):
+        required = [ p.name for p in self.params if isinstance(p, Param) and p.required and p.convert is None ]
+        lines = [ '    p = {%s}' % (', '.join("'%s': %s" % (n, n) for n in required)) ]
+        if self.files:
+            lines.append('    f = {}')
+        for p in self.params:
+            if isinstance(p, FileParam):
+                if p.upload_only:
+                    lines += [
+                        '    if %s is not None:' % (p.name),
+                        "        f['%s'] = %s" % (p.name, p.name) ]
+                else:
+                    lines += [
+                        '    if %s_file is not None:' % (p.name),
+                        "        f['%s'] = %s_file" % (p.name, p.name),
+                        '    elif %s_id is not None:' % (p.name),
+                        "        p['%s'] = %s_id" % (p.name, p.name),
+                        '    else:',
+                        "        raise ApiRequestError('%s_id and %s_file cannot be both None')" % (p.name, p.name) ]
+            elif p.convert is not None:
+                value = 'convert_%s(%s)' % (p.name, p.name)
+                if p.required:
+                    lines.append("    p['%s'] = %s" % (p.name, value))
+                else:
+                    lines += [
+                        '    if %s is not None:' % (p.name),
+                        "        p['%s'] = %s" % (p.name, value) ]
+            elif not p.required:
+                lines += [
+                    '    if %s is not None:' % (p.name),
+                    "        p['%s'] = %s" % (p.name, p.name) ]
+        return lines
+
+    def __compile(self, func_name, bound):
+        args = [ a for p in self.params for a in p.args ]
+        if bound:
+            args.insert(0, 'self')
+        lines = [ 'def %s(%s):' % (func_name, ', '.join(args)) ] + self.__body()
+        files = 'f or None' if self.files else 'None'
+        if bound:
+            lines.append("    return self._call('%s', p, %s, decode)" % (self.endpoint, files))
+        else:
+            lines.append('    return p, %s' % (files))
+        namespace = {
+            'ApiRequestError': ApiRequestError,
+            'decode': self.decode
+        }
+        for p in self.params:
+            if isinstance(p, Param) and p.convert is not None:
+                namespace['convert_%s' % (p.name)] = p.convert
+        exec(compile('\n'.join(lines), '<pytbo.methods %s>' % (self.name), 'exec'), namespace)
+        func = namespace[func_name]
+        func.__module__ = __name__
+        if bound:
+            func.__doc__ = self.doc
+        return func
+
+API_METHODS = [
+    ApiMethod('getMe', [], User,
+        doc="""
+        A simple method for testing your bot's auth token. Requires no parameters.
+        Returns basic information about the bot in form of a User object.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#getme>`_.
+        """,
+        read=True),
+    ApiMethod('getUpdates', [ 'offset=', 'limit=', 'timeout=' ], [ Update ],
+        doc="""
+        Use this method to receive incoming updates using long polling (wiki).
+        An Array of Update objects is returned.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#getupdates>`_.
+        """,
+        idempotent=True),
+    ApiMethod('setWebhook', [ 'url', FileParam('certificate', upload_only=True) ], True,
+        doc="""
+        Use this method to specify a url and receive incoming updates via an outgoing webhook.
+        Whenever there is an update for the bot, we will send an HTTPS POST request to the specified url, containing a JSON-serialized Update.
+        In case of an unsuccessful request, we will give up after a reasonable amount of attempts.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#setwebhook>`_.
+        """,
+        idempotent=True),
+    ApiMethod('unsetWebhook', [], True,
+        doc="""
+        Use this method to unset the webhook.
+        This is required to be able to receive updates again with the getUpdates method.
+        """,
+        endpoint='setWebhook',
+        idempotent=True),
+    ApiMethod('sendMessage',
+        [ 'chat_id', 'text', 'parse_mode=', 'disable_web_page_preview=', 'disable_notification=',
+          'reply_to_message_id=', 'reply_markup=' ],
+        Message,
+        doc="""
+        Use this method to send text messages.
+        On success, the sent Message is returned.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#sendmessage>`_.
+        """,
+        rate_limited=True),
+    ApiMethod('forwardMessage', [ 'chat_id', 'from_chat_id', 'message_id', 'disable_notification=' ], Message,
+        doc="""
+        Use this method to forward messages of any kind.
+        On success, the sent Message is returned.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#forwardmessage>`_.
+        """,
+        rate_limited=True),
+    ApiMethod('sendPhoto',
+        [ 'chat_id', FileParam('photo'), 'caption=', 'disable_notification=', 'reply_to_message_id=',
+          'reply_markup=' ],
+        Message,
+        doc="""
+        Use this method to send photos.
+        On success, the sent Message is returned.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#sendphoto>`_.
+        """,
+        rate_limited=True),
+    ApiMethod('sendAudio',
+        [ 'chat_id', FileParam('audio'), 'duration=', 'performer=', 'title=', 'disable_notification=',
+          'reply_to_message_id=', 'reply_markup=' ],
+        Message,
+        doc="""
+        Use this method to send audio files, if you want Telegram clients to display them in the music player.
+        Your audio must be in the .mp3 format. On success, the sent Message is returned.
+        Bots can currently send audio files of up to 50 MB in size, this limit may be changed in the future.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#sendaudio>`_.
+        """,
+        rate_limited=True),
+    ApiMethod('sendDocument',
+        [ 'chat_id', FileParam('document'), 'caption=', 'disable_notification=', 'reply_to_message_id=',
+          'reply_markup=' ],
+        Message,
+        doc="""
+        Use this method to send general files. On success, the sent Message is returned.
+        Bots can currently send files of any type of up to 50 MB in size, this limit may be changed in the future.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#senddocument>`_.
+        """,
+        rate_limited=True),
+    ApiMethod('sendSticker',
+        [ 'chat_id', FileParam('sticker'), 'disable_notification=', 'reply_to_message_id=', 'reply_markup=' ],
+        Message,
+        doc="""
+        Use this method to send .webp stickers. On success, the sent Message is returned.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#sendsticker>`_.
+        """,
+        rate_limited=True),
+    ApiMethod('sendVideo',
+        [ 'chat_id', FileParam('video'), 'duration=', 'width=', 'height=', 'caption=', 'disable_notification=',
+          'reply_to_message_id=', 'reply_markup=' ],
+        Message,
+        doc="""
+        Use this method to send video files, Telegram clients support mp4 videos (other formats may be sent as Document).
+        On success, the sent Message is returned.
+        Bots can currently send video files of up to 50 MB in size, this limit may be changed in the future.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#sendvideo>`_.
+        """,
+        rate_limited=True),
+    ApiMethod('sendVoice',
+        [ 'chat_id', FileParam('voice'), 'duration=', 'disable_notification=', 'reply_to_message_id=',
+          'reply_markup=' ],
+        Message,
+        doc="""
+        Use this method to send audio files, if you want Telegram clients to display the file as a playable voice message.
+        For this to work, your audio must be in an .ogg file encoded with OPUS (other formats may be sent as Audio or Document).
+        On success, the sent Message is returned. Bots can currently send voice messages of up to 50 MB in size, this limit may be changed in the future.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#sendvoice>`_.
+        """,
+        rate_limited=True),
+    ApiMethod('sendLocation',
+        [ 'chat_id', 'latitude', 'longitude', 'disable_notification=', 'reply_to_message_id=', 'reply_markup=' ],
+        Message,
+        doc="""
+        Use this method to send point on the map. On success, the sent Message is returned.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#sendlocation>`_.
+        """,
+        rate_limited=True),
+    ApiMethod('sendVenue',
+        [ 'chat_id', 'latitude', 'longitude', 'title', 'address', 'foursquare_id=', 'disable_notification=',
+          'reply_to_message_id=', 'reply_markup=' ],
+        Message,
+        doc="""
+        Use this method to send information about a venue. On success, the sent Message is returned.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#sendvenue>`_.
+        """,
+        rate_limited=True),
+    ApiMethod('sendContact',
+        [ 'chat_id', 'phone_number', 'first_name', 'last_name=', 'disable_notification=', 'reply_to_message_id=',
+          'reply_markup=' ],
+        Message,
+        doc="""
+        Use this method to send phone contacts. On success, the sent Message is returned.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#sendcontact>`_.
+        """,
+        rate_limited=True),
+    ApiMethod('sendChatAction', [ 'chat_id', 'action' ], True,
+        doc="""
+        Use this method when you need to tell the user that something is happening on the bot's side.
+        The status is set for 5 seconds or less (when a message arrives from your bot, Telegram clients clear its typing status).
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#sendchataction>`_.
+        """,
+        idempotent=True),
+    ApiMethod('getUserProfilePhotos', [ 'user_id', 'offset=', 'limit=' ], UserProfilePhotos,
+        doc="""
+        Use this method to get a list of profile pictures for a user. Returns a UserProfilePhotos object.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#getuserprofilephotos>`_.
+        """,
+        read=True),
+    ApiMethod('getFile', [ 'file_id' ], File,
+        doc="""
+        Use this method to get basic info about a file and prepare it for downloading.
+        For the moment, bots can download files of up to 20MB in size. On success, a File object is returned.
+        The file can then be downloaded via the link https://api.telegram.org/file/bot<token>/<file_path>, where <file_path> is taken from the response.
+        It is guaranteed that the link will be valid for at least 1 hour. When the link expires, a new one can be requested by calling getFile again.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#getfile>`_.
+        """,
+        read=True),
+    ApiMethod('kickChatMember', [ 'chat_id', 'user_id' ], True,
+        doc="""
+        Use this method to kick a user from a group or a supergroup.
+        In the case of supergroups, the user will not be able to return to the group on their own using invite links, etc., unless unbanned first.
+        The bot must be an administrator in the group for this to work. Returns True on success.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#kickchatmember>`_.
+        """,
+        idempotent=True),
+    ApiMethod('unbanChatMember', [ 'chat_id', 'user_id' ], True,
+        doc="""
+        Use this method to unban a previously kicked user in a supergroup.
+        The user will not return to the group automatically, but will be able to join via link, etc.
+        The bot must be an administrator in the group for this to work. Returns True on success.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#unbanchatmember>`_.
+        """,
+        idempotent=True),
+    ApiMethod('answerCallbackQuery', [ 'callback_query_id', 'text=', 'show_alert=' ], True,
+        doc="""
+        Use this method to send answers to callback queries sent from inline keyboards.
+        The answer will be displayed to the user as a notification at the top of the chat screen or as an alert. On success, True is returned.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#answercallbackquery>`_.
+        """),
+    ApiMethod('editMessageText',
+        [ 'text', 'chat_id=', 'message_id=', 'inline_message_id=', 'parse_mode=', 'disable_web_page_preview=',
+          'reply_markup=' ],
+        (Message, True),
+        doc="""
+        Use this method to edit text messages sent by the bot or via the bot (for inline bots).
+        On success, if edited message is sent by the bot, the edited Message is returned, otherwise True is returned.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#editmessagetext>`_.
+        """,
+        idempotent=True),
+    ApiMethod('editMessageCaption', [ 'chat_id=', 'message_id=', 'inline_message_id=', 'caption=', 'reply_markup=' ],
+        (Message, True),
+        doc="""
+        Use this method to edit captions of messages sent by the bot or via the bot (for inline bots).
+        On success, if edited message is sent by the bot, the edited Message is returned, otherwise True is returned.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#editmessagecaption>`_.
+        """,
+        idempotent=True),
+    ApiMethod('editMessageReplyMarkup', [ 'chat_id=', 'message_id=', 'inline_message_id=', 'reply_markup=' ],
+        (Message, True),
+        doc="""
+        Use this method to edit only the reply markup of messages sent by the bot or via the bot (for inline bots).
+        On success, if edited message is sent by the bot, the edited Message is returned, otherwise True is returned.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#editmessagereplymarkup>`_.
+        """,
+        idempotent=True),
+    ApiMethod('answerInlineQuery',
+        [ 'inline_query_id', Param('results', convert=list_or_json), 'cache_time=', 'is_personal=', 'next_offset=',
+          'switch_pm_text=', 'switch_pm_parameter=' ],
+        True,
+        doc="""
+        Use this method to send answers to an inline query.
+        On success, True is returned. No more than 50 results per query are allowed.
+
+        For more details read the `Telegram docs <https://core.telegram.org/bots/api#answerinlinequery>`_.
+        """)
+]
+
+METHODS = dict((m.name, m) for m in API_METHODS)
+
+def api_methods(cls):
+    """Class decorator adding a method for every entry of the API method table that the class does not define."""
+    for m in API_METHODS:
+        if m.name not in cls.__dict__:
+            func = m.method
+            func.__qualname__ = '%s.%s' % (cls.__name__, m.name)
+            setattr(cls, m.name, func)
+    return cls
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.poll
+~~~~~~~~~~
+
+This module implements the long polling loops receiving the updates of the bots.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import asyncio
+import collections
+import inspect
+import threading
+
+from .errors import ApiResponseError, NetworkError
+from .retry import RetryPolicy
+
+MAX_BATCH_LIMIT = 100
+MIN_BATCH_LIMIT = 10
+
+class BasePoller(object):
+    """
+    The state shared by the synchronous and asynchronous pollers.
+
+    Every ``getUpdates`` call waits up to ``timeout`` seconds on the Telegram servers for new updates,
+    so updates are received as soon as they arrive, and it asks for at most ``limit`` of them.
+    ``offset`` is the id of the next update to receive: it moves past every update handed to the caller,
+    and Telegram forgets the updates before it on the next call, so updates are received only once.
+    Failed calls are repeated according to ``retry_policy``, by default forever, with exponential backoff
+    for network and server errors and waiting the time required by Telegram for flood control errors;
+    other errors, like a conflict with a webhook, are raised.
+
+    With ``prefetch``, the next call is made as soon as a batch of updates is received, so that it runs
+    while the batch is handled. Telegram then forgets the updates of a batch once they are received, not
+    once they are handled, and a crash loses the updates of the batch not handled yet. To keep that window
+    small, the size of the batches follows the rate of the updates: ``batch_limit`` doubles, up to ``limit``
+    (100 by default), when a batch is full, and it halves, down to MIN_BATCH_LIMIT, when a batch is mostly
+    empty. The ``timeout`` is kept, since Telegram answers as soon as there are updates anyway.
+    """
+
+    def __init__(self, bot, timeout=30, limit=None, offset=None, retry_policy=None, prefetch=False):
+        self.bot = bot
+        self.timeout = timeout
+        self.limit = limit
+        self.offset = offset
+        self.retry_policy = RetryPolicy(max_retries=float('inf'), max_retry_after=3600) if retry_policy is None else retry_policy
+        self.prefetch = prefetch
+        self.batch_limit = limit if not prefetch else (limit or MAX_BATCH_LIMIT)
+        self.received = 0
+        self.failures = 0
+
+    def _retry_delay(self, attempt, error):
+        delay = self.retry_policy.retry_delay('getUpdates', attempt, error)
+        if delay is None:
+            raise error
+        self.failures += 1
+        return delay
+
+    def _received(self, updates):
+        self.received += len(updates)
+        if self.prefetch:
+            max_limit = self.limit or MAX_BATCH_LIMIT
+            if len(updates) >= self.batch_limit:
+                self.batch_limit = min(max_limit, self.batch_limit * 2)
+            elif len(updates) < self.batch_limit // 4:
+                self.batch_limit = max(min(MIN_BATCH_LIMIT, max_limit), self.batch_limit // 2)
+        return updates
+
+class Poller(BasePoller):
+    """
+    Receives the updates of a BareBot with long polling.
+
+    Iterating over a poller yields the updates as they arrive, until ``stop()`` is called, e.g. by the
+    code handling an update or by another thread. A stopped poller returns once the running call, if any,
+    is over, confirming the updates already yielded; the other updates received are left to the next poller,
+    unless they were confirmed by a prefetching call, in which case they are yielded first.
+    Leaving the loop with ``break`` does not confirm them: a new poller started from ``offset`` does.
+    Prefetching calls run on the bot thread pool.
+    """
+
+    def __init__(self, bot, timeout=30, limit=None, offset=None, retry_policy=None, prefetch=False):
+        super(Poller, self).__init__(bot, timeout, limit, offset, retry_policy, prefetch)
+        self.__stopped = threading.Event()
+
+    def __iter__(self):
+        self.__stopped.clear()
+        updates = collections.deque()
+        next_call = None
+        while True:
+            if not updates:
+                if self.__stopped.is_set():
+                    break
+                batch = self.__fetch(self.offset) if next_call is None else next_call.result()
+                next_call = None
+                updates.extend(batch)
+                if self.prefetch and updates and not self.__stopped.is_set():
+                    next_call = self.bot.submit(self.__fetch, updates[-1].update_id + 1)
+                continue
+            if self.__stopped.is_set() and next_call is None:
+                break
+            update = updates.popleft()
+            self.offset = update.update_id + 1
+            yield update
+        if next_call is None:
+            self.confirm()
+
+    def stop(self):
+        """Stops the poller once the running ``getUpdates`` call, if any, is over."""
+        self.__stopped.set()
+
+    def run(self, handler):
+        """Calls ``handler(update)`` for every update, until ``stop()`` is called."""
+        for update in self:
+            handler(update)
+
+    def confirm(self):
+        """Tells Telegram that the updates before ``offset`` were received, without waiting for new ones."""
+        if self.offset is not None:
+            self.bot.getUpdates(self.offset, 1, 0)
+
+    def __fetch(self, offset):
+        attempt = 0
+        while True:
+            try:
+                return self._received(self.bot.getUpdates(offset, self.batch_limit, self.timeout))
+            except (ApiResponseError, NetworkError) as e:
+                if self.__stopped.wait(self._retry_delay(attempt, e)):
+                    return []
+                attempt += 1
+
+class AsyncPoller(BasePoller):
+    """
+    The asynchronous counterpart of Poller, for AsyncBareBot, iterated with ``async for``.
+    ``stop()`` cancels the running ``getUpdates`` call instead of waiting for it to end.
+    """
+
+    def __init__(self, bot, timeout=30, limit=None, offset=None, retry_policy=None, prefetch=False):
+        super(AsyncPoller, self).__init__(bot, timeout, limit, offset, retry_policy, prefetch)
+        self.__stopped = False
+        self.__call = None
+
+    async def __aiter__(self):
+        self.__stopped = False
+        updates = collections.deque()
+        prefetched = False
+        try:
+            while True:
+                if not updates:
+                    if self.__stopped:
+                        break
+                    if self.__call is None:
+                        self.__call = asyncio.ensure_future(self.__fetch(self.offset))
+                    try:
+                        batch = await self.__call
+                    except asyncio.CancelledError:
+                        if not self.__stopped:
+                            raise
+                        break
+                    finally:
+                        self.__call = None
+                    updates.extend(batch)
+                    prefetched = self.prefetch and bool(updates) and not self.__stopped
+                    if prefetched:
+                        self.__call = asyncio.ensure_future(self.__fetch(updates[-1].update_id + 1))
+                    continue
+                if self.__stopped and not prefetched:
+                    break
+                update = updates.popleft()
+                self.offset = update.update_id + 1
+                yield update
+        finally:
+            if self.__call is not None:
+                self.__call.cancel()
+                self.__call = None
+        await self.confirm()
+
+    def stop(self):
+        """Stops the poller, cancelling the running ``getUpdates`` call, if any."""
+        self.__stopped = True
+        if self.__call is not None:
+            self.__call.cancel()
+
+    async def run(self, handler):
+        """Calls ``handler(update)``, awaiting it if it is a coroutine function, for every update, until ``stop()`` is called."""
+        async for update in self:
+            result = handler(update)
+            if inspect.isawaitable(result):
+                await result
+
+    async def confirm(self):
+        """Tells Telegram that the updates before ``offset`` were received, without waiting for new ones."""
+        if self.offset is not None:
+            await self.bot.getUpdates(self.offset, 1, 0)
+
+    async def __fetch(self, offset):
+        attempt = 0
+        while True:
+            try:
+                return self._received(await self.bot.getUpdates(offset, self.batch_limit, self.timeout))
+            except (ApiResponseError, NetworkError) as e:
+                await asyncio.sleep(self._retry_delay(attempt, e))
+                attempt += 1
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.prepared
+~~~~~~~~~~~~~~
+
+This module implements the API calls prepared once and made many times with the same parameters.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+from .errors import ApiRequestError
+from .methods import METHODS, FileParam
+from .transport import form_value, json_value
+from .upload import as_input_file
+
+class PreparedParams(dict):
+    """
+    The parameters of a prepared call: a plain dict, for the code reading them, which also holds the
+    encoding of its invariant parameters, so that transports only encode the ones added to it.
+    """
+
+    def __init__(self, prepared, fragment, form):
+        super(PreparedParams, self).__init__(prepared)
+        self.__prepared = prepared
+        self.__fragment = fragment
+        self.__form = form
+
+    def to_json(self):
+        """Returns the parameters as a compact JSON object."""
+        items = [ '"%s":%s' % (k, json_value(v)) for k, v in self.items() if k not in self.__prepared ]
+        if self.__fragment:
+            items.append(self.__fragment)
+        return '{' + ','.join(items) + '}'
+
+    def to_form(self):
+        """Returns the parameters as form fields."""
+        fields = dict(self.__form)
+        for k, v in self.items():
+            if k not in self.__prepared:
+                fields[k] = form_value(v)
+        return fields
+
+class PreparedCall(object):
+    """
+    A call of an API method whose parameters, but a few ones like ``chat_id``, are given once.
+
+    The invariant parameters are checked and encoded when the call is prepared, so that every call only
+    encodes the parameters given to it. Calling the object makes the API call, through the bot, exactly like
+    the corresponding bot method; parameters already prepared cannot be given again, and files can only be
+    given when the call is prepared. Files to upload are sent again by every call, from the same start,
+    so prepared calls should send files by id.
+    """
+
+    def __init__(self, bot, method, params):
+        spec = METHODS.get(method)
+        if spec is None:
+            raise ApiRequestError("'%s' is not an API method" % (method))
+        self.bot = bot
+        self.method = method
+        names = set()
+        for p in spec.params:
+            names.update(a.split('=')[0] for a in p.args)
+        self.__check(names, params)
+        prepared = {}
+        files = {}
+        required = set()
+        converters = {}
+        for p in spec.params:
+            if isinstance(p, FileParam):
+                upload = params.get(p.name if p.upload_only else '%s_file' % (p.name))
+                if upload is not None:
+                    files[p.name] = as_input_file(upload)
+                elif not p.upload_only and params.get('%s_id' % (p.name)) is not None:
+                    prepared[p.name] = params['%s_id' % (p.name)]
+                elif not p.upload_only:
+                    raise ApiRequestError('%s_id and %s_file cannot be both None' % (p.name, p.name))
+                continue
+            value = params.get(p.name)
+            if value is not None:
+                prepared[p.name] = value if p.convert is None else p.convert(value)
+            elif p.required:
+                required.add(p.name)
+            if p.convert is not None:
+                converters[p.name] = p.convert
+        self.params = prepared
+        self.files = files or None
+        self.required = frozenset(required)
+        self.__names = frozenset(p.name for p in spec.params if not isinstance(p, FileParam))
+        self.__file_args = names - self.__names
+        self.__converters = converters
+        self.__endpoint = spec.endpoint
+        self.__decode = spec.decode
+        self.__fragment = ','.join([ '"%s":%s' % (k, json_value(v)) for k, v in prepared.items() ])
+        self.__form = dict([ (k, form_value(v)) for k, v in prepared.items() ])
+
+    def __call__(self, chat_id=None, **params):
+        if chat_id is not None:
+            params['chat_id'] = chat_id
+        for k in params:
+            if k in self.__file_args:
+                raise ApiRequestError("'%s' can only be given when '%s' is prepared" % (k, self.method))
+        self.__check(self.__names, params)
+        p = PreparedParams(self.params, self.__fragment, self.__form)
+        for k, v in params.items():
+            if k in self.params:
+                raise ApiRequestError("'%s' is already prepared for '%s'" % (k, self.method))
+            if v is not None:
+                convert = self.__converters.get(k)
+                p[k] = v if convert is None else convert(v)
+        for name in self.required:
+            if name not in p:
+                raise ApiRequestError("'%s' requires '%s'" % (self.method, name))
+        return self.bot._call(self.__endpoint, p, self.files, self.__decode)
+
+    def __check(self, names, params):
+        unknown = [ k for k in params if k not in names ]
+        if unknown:
+            raise ApiRequestError("'%s' has no %s parameter" % (self.method, ', '.join(sorted(unknown))))
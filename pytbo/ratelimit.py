@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.ratelimit
+~~~~~~~~~~~~~~~
+
+This module implements an outbound rate limiter following the Telegram Bots API limits.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import asyncio
+import threading
+import time
+
+from .methods import API_METHODS
+
+RATE_LIMITED_METHODS = frozenset(m.endpoint for m in API_METHODS if m.rate_limited)
+
+GROUP_CHAT_TYPES = frozenset([ 'group', 'supergroup', 'channel' ])
+
+class TokenBucket(object):
+    """
+    A token bucket refilled with ``rate`` tokens per second, holding at most ``capacity`` tokens.
+
+    Tokens are reserved rather than waited for: the bucket can go in debt, and ``reserve`` returns
+    how long the caller must wait before its token is actually available.
+    """
+
+    def __init__(self, rate, capacity=1, now=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = self.capacity
+        self.timestamp = time.monotonic() if now is None else now
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.timestamp) * self.rate)
+        self.timestamp = now
+
+    def reserve(self, now):
+        """Takes a token and returns the number of seconds to wait before using it."""
+        self.refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def is_full(self, now):
+        return self.tokens + (now - self.timestamp) * self.rate >= self.capacity
+
+class RateLimiter(object):
+    """
+    Schedules outgoing messages within the Telegram limits: about 30 messages per second overall,
+    1 message per second to the same chat and 20 messages per minute to the same group.
+
+    A send first waits for the buckets of its own chat, and only then takes a token from the global
+    bucket, so chats that are sending too fast never hold back the others. Chats are told apart using
+    their type, learned from the Chat objects seen by the bot or given to ``register_chat``; unknown
+    chats with a negative id are treated as groups. Once more than ``max_idle_chats`` chats are known,
+    the buckets and the types of the idle chats are forgotten.
+    """
+
+    def __init__(self,
+            global_rate=30,
+            global_burst=30,
+            chat_rate=1,
+            chat_burst=1,
+            group_rate=20 / 60.0,
+            group_burst=20,
+            max_idle_chats=10000):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self.max_idle_chats = max_idle_chats
+        self.chat_types = {}
+        self.__chat_buckets = {}
+        self.__group_buckets = {}
+        self.__lock = threading.Lock()
+
+    def register_chat(self, chat):
+        """Records the type of a chat, given as a Chat object or as a dict."""
+        chat_id, chat_type = (chat['id'], chat['type']) if isinstance(chat, dict) else (chat.id, chat.type)
+        with self.__lock:
+            if len(self.chat_types) > self.max_idle_chats and chat_id not in self.chat_types:
+                self.__prune(time.monotonic())
+            self.chat_types[chat_id] = chat_type
+
+    def is_group(self, chat_id, chat_type=None):
+        if chat_type is None:
+            chat_type = self.chat_types.get(chat_id)
+        if chat_type is None:
+            try:
+                return int(chat_id) < 0
+            except ValueError:
+                return True
+        return chat_type in GROUP_CHAT_TYPES
+
+    def reserve_chat(self, chat_id, chat_type=None):
+        """Reserves a token from the buckets of the given chat and returns the seconds to wait for it."""
+        now = time.monotonic()
+        with self.__lock:
+            if len(self.__chat_buckets) > self.max_idle_chats:
+                self.__prune(now)
+            bucket = self.__chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self.__chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst, now)
+            delay = bucket.reserve(now)
+            if self.is_group(chat_id, chat_type):
+                bucket = self.__group_buckets.get(chat_id)
+                if bucket is None:
+                    bucket = self.__group_buckets[chat_id] = TokenBucket(self.group_rate, self.group_burst, now)
+                delay = max(delay, bucket.reserve(now))
+        return delay
+
+    def reserve_global(self):
+        """Reserves a token from the global bucket and returns the seconds to wait for it."""
+        now = time.monotonic()
+        with self.__lock:
+            return self.global_bucket.reserve(now)
+
+    def acquire(self, chat_id=None, chat_type=None):
+        """Blocks until a message can be sent to the given chat."""
+        if chat_id is not None:
+            delay = self.reserve_chat(chat_id, chat_type)
+            if delay > 0:
+                time.sleep(delay)
+        delay = self.reserve_global()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self, chat_id=None, chat_type=None):
+        """Waits, without blocking the event loop, until a message can be sent to the given chat."""
+        if chat_id is not None:
+            delay = self.reserve_chat(chat_id, chat_type)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        delay = self.reserve_global()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def __prune(self, now):
+        for buckets in (self.__chat_buckets, self.__group_buckets):
+            for chat_id in [ k for k, b in buckets.items() if b.is_full(now) ]:
+                del buckets[chat_id]
+        for chat_id in [ k for k in self.chat_types if k not in self.__chat_buckets ]:
+            del self.chat_types[chat_id]
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.retry
+~~~~~~~~~~~
+
+This module implements the policies used by the bots to retry failed Telegram Bots API calls.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import random
+import threading
+
+from .errors import ApiResponseError, NetworkError
+from .methods import API_METHODS
+
+IDEMPOTENT_METHODS = frozenset([ m.endpoint for m in API_METHODS if m.idempotent ] + [ 'downloadFile' ])
+
+TRANSIENT_ERROR_CODES = frozenset([ 500, 502, 503, 504 ])
+
+class RetryBudget(object):
+    """
+    Caps retries to a fraction of the calls made, so that an outage does not multiply the traffic.
+
+    Every call deposits ``ratio`` tokens, up to ``max_tokens``, and every retry withdraws one:
+    when the budget is empty, failures are raised without retrying.
+    """
+
+    def __init__(self, ratio=0.2, max_tokens=100):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = float(max_tokens)
+        self.__lock = threading.Lock()
+
+    def deposit(self):
+        with self.__lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self.__lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+class RetryPolicy(object):
+    """
+    Decides whether and when a failed API call is repeated.
+
+    Flood control errors (429) are always retried after the ``retry_after`` seconds required by Telegram,
+    unless they exceed ``max_retry_after``, since the request was not executed. Network errors and transient
+    server errors (5xx) are retried with exponential backoff and full jitter, but only for idempotent methods
+    unless ``idempotent_only`` is False, since the request may have been executed anyway.
+
+    ``methods`` maps method names to the policies overriding this one for them, and ``budget`` is an optional
+    RetryBudget shared by all of them.
+    """
+
+    def __init__(self,
+            max_retries=3,
+            backoff_factor=0.5,
+            max_backoff=30,
+            jitter=True,
+            max_retry_after=60,
+            idempotent_only=True,
+            budget=None,
+            methods=None):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.max_retry_after = max_retry_after
+        self.idempotent_only = idempotent_only
+        self.budget = budget
+        self.methods = {} if methods is None else methods
+
+    def for_method(self, method):
+        """Returns the policy applied to the given method."""
+        return self.methods.get(method, self)
+
+    def record_call(self, method):
+        """Records a new call of the given method in the retry budget."""
+        budget = self.for_method(method).budget or self.budget
+        if budget is not None:
+            budget.deposit()
+
+    def backoff(self, attempt):
+        delay = min(self.max_backoff, self.backoff_factor * (2 ** min(attempt, 32)))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def retry_delay(self, method, attempt, error):
+        """
+        Returns the seconds to wait before repeating a call that failed with ``error`` after
+        ``attempt`` retries, or None if the call must not be repeated.
+        """
+
+        policy = self.for_method(method)
+        if attempt >= policy.max_retries:
+            return None
+        if isinstance(error, ApiResponseError) and error.error_code == 429:
+            retry_after = error.retry_after
+            if retry_after is None:
+                delay = policy.backoff(attempt)
+            elif retry_after > policy.max_retry_after:
+                return None
+            else:
+                delay = retry_after
+        elif isinstance(error, NetworkError) or (isinstance(error, ApiResponseError) and error.error_code in TRANSIENT_ERROR_CODES):
+            if policy.idempotent_only and method not in IDEMPOTENT_METHODS:
+                return None
+            delay = policy.backoff(attempt)
+        else:
+            return None
+        budget = policy.budget or self.budget
+        if budget is not None and not budget.withdraw():
+            return None
+        return delay
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.shard
+~~~~~~~~~~~
+
+This module implements the concurrent handling of the updates, in order for every chat.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import asyncio
+import queue
+import sys
+import threading
+
+_STOP = object()
+
+def shard_key(update):
+    """
+    Returns the key of the updates that must be handled in order with the given one: the id of the chat
+    of a message, the id of the user of inline queries, chosen inline results and callback queries.
+    """
+
+    if update.message is not None:
+        return update.message.chat.id
+    for query in (update.callback_query, update.inline_query, update.chosen_inline_result):
+        if query is not None:
+            return query.sender.id
+    return None
+
+class ShardedExecutor(object):
+    """
+    Handles the updates with ``handler(update)`` on ``workers`` threads, each one owning the updates
+    of a subset of the chats, picked by ``shard_key()``: the updates of a chat are handled one at a time,
+    in the order they were submitted, while the updates of chats of different shards are handled in parallel.
+    A slow update delays the other updates of its shard only.
+
+    Every shard queues at most ``max_queue`` updates. When a shard is full, ``submit()`` blocks until the
+    shard catches up, which stops the poller or the webhook feeding the executor: a poller stops asking
+    for updates, and a WebhookServer fills its own queue and answers 503, so Telegram keeps the updates
+    instead of the process memory. Submit the updates from one thread or task at a time, e.g. passing
+    the executor to ``Poller.run()``, or ``submit_async`` to ``AsyncPoller.run()`` and ``WebhookServer.run()``,
+    not to ``WebhookServer.serve()``, which runs the handlers concurrently and would lose their order.
+
+    Errors of the handler are passed to ``error_handler(update, error)``, by default printed to stderr,
+    and the following updates are handled anyway. ``close()`` handles the updates already submitted,
+    then stops the threads.
+
+        with pytbo.ShardedExecutor(dispatcher, workers=16) as executor:
+            bot.poll().run(executor)
+    """
+
+    def __init__(self, handler, workers=8, max_queue=100, error_handler=None):
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.error_handler = error_handler
+        self.queues = [ queue.Queue(max_queue) for _ in range(workers) ]
+        self.__handled = [ 0 ] * workers
+        self.__failed = [ 0 ] * workers
+        self.__closed = False
+        self.__threads = []
+        for index in range(workers):
+            thread = threading.Thread(target=self.__work, args=(index,), name='pytbo-shard-%d' % (index))
+            thread.daemon = True
+            thread.start()
+            self.__threads.append(thread)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def shard(self, update):
+        """Returns the index of the shard handling the update."""
+        key = shard_key(update)
+        return 0 if key is None else hash(key) % self.workers
+
+    def submit(self, update):
+        """Queues the update on its shard, waiting while the shard is full."""
+        if self.__closed:
+            raise RuntimeError('cannot submit updates to a closed executor')
+        self.queues[self.shard(update)].put(update)
+
+    __call__ = submit
+
+    async def submit_async(self, update):
+        """The coroutine counterpart of ``submit()``, waiting for a full shard without blocking the event loop."""
+        if self.__closed:
+            raise RuntimeError('cannot submit updates to a closed executor')
+        shard = self.queues[self.shard(update)]
+        try:
+            shard.put_nowait(update)
+        except queue.Full:
+            await asyncio.get_event_loop().run_in_executor(None, shard.put, update)
+
+    def stats(self):
+        """Returns the numbers of updates queued, handled, and whose handler failed, as a dict."""
+        return {
+            'queued': sum(q.qsize() for q in self.queues),
+            'handled': sum(self.__handled),
+            'failed': sum(self.__failed)
+        }
+
+    def close(self, wait=True):
+        """Stops accepting updates; the threads stop once they have handled the updates already queued."""
+        if not self.__closed:
+            self.__closed = True
+            for q in self.queues:
+                q.put(_STOP)
+        if wait:
+            for thread in self.__threads:
+                thread.join()
+
+    def __work(self, index):
+        shard = self.queues[index]
+        while True:
+            update = shard.get()
+            if update is _STOP:
+                return
+            try:
+                self.handler(update)
+            except Exception as e:
+                self.__failed[index] += 1
+                if self.error_handler is not None:
+                    self.error_handler(update, e)
+                else:
+                    sys.excepthook(type(e), e, e.__traceback__)
+            self.__handled[index] += 1
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.supervisor
+~~~~~~~~~~~~~~~~
+
+This module implements the supervisor of the processes serving a webhook together.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import time
+
+from .webhook import WebhookServer
+
+def run_worker(main, index, options, reports, report_interval):
+    """
+    The body of a worker process: serves the webhook with ``main(server)`` until SIGTERM, reporting
+    the server counters to the supervisor every ``report_interval`` seconds and once more on exit.
+    """
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    def report(server, final=False):
+        stats = server.stats()
+        stats['index'] = index
+        stats['final'] = final
+        try:
+            reports.put_nowait((os.getpid(), stats))
+        except queue.Full:
+            pass
+
+    async def serve():
+        loop = asyncio.get_event_loop()
+        server = WebhookServer(reuse_port=True, **options)
+        await server.start()
+        loop.add_signal_handler(signal.SIGTERM, server.stop)
+
+        def tick():
+            report(server)
+            ticker[0] = loop.call_later(report_interval, tick)
+
+        ticker = [ None ]
+        tick()
+        try:
+            await main(server)
+        finally:
+            ticker[0].cancel()
+            await server.close()
+            report(server, True)
+
+    asyncio.run(serve())
+
+class WebhookSupervisor(object):
+    """
+    Serves a webhook with ``workers`` processes, by default one per CPU, listening on the same port with
+    SO_REUSEPORT, so that the kernel spreads the Telegram connections among them and the handlers of
+    different processes run in parallel. Every process has its own WebhookServer, queue and bot.
+
+    ``main(server)`` is the coroutine function run by each worker with its started WebhookServer, e.g.
+    creating an AsyncBareBot and awaiting ``server.serve(handler, bot)``; it must return once the server
+    is stopped, and it must be picklable, i.e. defined at the top level of a module, unless the processes
+    are forked. The other options are passed to every WebhookServer.
+
+    Workers that die are started again, after ``restart_delay`` seconds if they did not even last as much.
+    ``restart()`` replaces the workers one at a time, starting the new one before stopping the old one,
+    so that the port keeps accepting updates; only the connections queued by the kernel to a stopping
+    worker and not accepted yet are reset, and Telegram delivers their updates again. Stopped workers stop
+    accepting updates, handle the ones they accepted and exit, or they are killed after ``grace`` seconds.
+
+    ``metrics()`` returns the last counters reported by every worker, and ``run()`` supervises the workers
+    until SIGINT or SIGTERM, restarting them on SIGHUP.
+    """
+
+    def __init__(self,
+            main,
+            port,
+            host='0.0.0.0',
+            workers=None,
+            grace=30,
+            restart_delay=1,
+            report_interval=5,
+            start_method=None,
+            **options):
+        self.main = main
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.grace = grace
+        self.restart_delay = restart_delay
+        self.report_interval = report_interval
+        self.options = dict(options, host=host, port=port)
+        self.processes = {}
+        self.restarts = 0
+        self.__context = multiprocessing.get_context(start_method)
+        self.__reports = self.__context.Queue()
+        self.__started = {}
+        self.__metrics = {}
+        self.__stopping = False
+
+    def start(self):
+        """Starts the worker processes."""
+        self.__stopping = False
+        for index in range(self.workers):
+            self.__spawn(index)
+
+    def check(self):
+        """Collects the reports of the workers and starts again the ones that died."""
+        self.__collect()
+        if self.__stopping:
+            return
+        for index, process in list(self.processes.items()):
+            if not process.is_alive():
+                process.join()
+                self.restarts += 1
+                if time.monotonic() - self.__started[index] < self.restart_delay:
+                    time.sleep(self.restart_delay)
+                self.__spawn(index)
+
+    def restart(self):
+        """Replaces the workers one at a time, for a new version of the code or of the configuration."""
+        for index, old in list(self.processes.items()):
+            new = self.__spawn(index)
+            deadline = time.monotonic() + self.grace
+            while new.pid not in self.__metrics and new.is_alive() and time.monotonic() < deadline:
+                self.__collect(0.1)
+            self.__retire([ old ])
+
+    def stop(self):
+        """Stops all the workers, waiting up to ``grace`` seconds for them to finish their work."""
+        self.__stopping = True
+        self.__retire(list(self.processes.values()))
+        self.processes.clear()
+        self.__collect()
+
+    def metrics(self):
+        """
+        Returns the last counters reported by the running workers, by process id, and their sums,
+        with the key 'total'.
+        """
+
+        self.__collect()
+        pids = set(p.pid for p in self.processes.values())
+        metrics = dict((pid, stats) for pid, stats in self.__metrics.items() if pid in pids)
+        total = {}
+        for stats in metrics.values():
+            for key, value in stats.items():
+                if key not in ('index', 'final'):
+                    total[key] = total.get(key, 0) + value
+        metrics['total'] = total
+        return metrics
+
+    def run(self):
+        """Starts the workers and supervises them until SIGINT or SIGTERM; SIGHUP restarts them."""
+        signals = {}
+
+        def request(signum, frame):
+            signals[signum] = True
+
+        handled = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)
+        previous = dict((signum, signal.signal(signum, request)) for signum in handled)
+        try:
+            self.start()
+            while not (signals.pop(signal.SIGINT, False) or signals.pop(signal.SIGTERM, False)):
+                if signals.pop(signal.SIGHUP, False):
+                    self.restart()
+                self.check()
+                self.__collect(0.5)
+        finally:
+            self.stop()
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+
+    def __spawn(self, index):
+        process = self.__context.Process(
+            target=run_worker,
+            args=(self.main, index, self.options, self.__reports, self.report_interval),
+            name='pytbo-webhook-%d' % (index))
+        process.start()
+        self.processes[index] = process
+        self.__started[index] = time.monotonic()
+        return process
+
+    def __retire(self, processes):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.grace
+        for process in processes:
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+            self.__metrics.pop(process.pid, None)
+
+    def __collect(self, timeout=0):
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                pid, stats = self.__reports.get(timeout=max(0, deadline - time.monotonic())) if timeout else \
+                    self.__reports.get_nowait()
+            except queue.Empty:
+                return
+            if not stats['final']:
+                self.__metrics[pid] = stats
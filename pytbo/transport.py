@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.transport
+~~~~~~~~~~~~~~~
+
+This module implements the transports used by the bots to reach the Telegram Bots API.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import json
+import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
+
+from .download import skip_prefix
+from .errors import ApiResponseError, MalformedResponseError, NetworkError
+from .upload import CHUNK_SIZE, as_input_file
+
+TELEGRAM_API_URL = 'https://api.telegram.org'
+
+JSON_HEADERS = { 'Content-Type': 'application/json' }
+
+def parse_response(text, method, status=None):
+    """
+    Parses the body of a Telegram Bot API response.
+    Server errors without a JSON body, like the ones of a proxy, are turned into API error responses.
+    """
+
+    try:
+        return json.loads(text)
+    except json.decoder.JSONDecodeError:
+        if status is not None and status >= 500:
+            return { 'ok': False, 'error_code': status, 'description': 'HTTP error %d' % (status) }
+        raise MalformedResponseError("failed to parse '%s' response" % (method))
+
+def json_value(value):
+    """Returns the compact JSON representation of a parameter value."""
+    to_json = getattr(value, 'to_json', None)
+    if to_json is not None:
+        return to_json()
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join([ json_value(v) for v in value ]) + ']'
+    return json.dumps(value, ensure_ascii=False, separators=(',',':'))
+
+def form_value(value):
+    """Returns the representation of a parameter value in a query string or in a form."""
+    if isinstance(value, str):
+        return value
+    if hasattr(value, 'to_json') or isinstance(value, (list, tuple, dict)):
+        return json_value(value)
+    return str(value)
+
+def encode_form(params):
+    """Encodes API call parameters as form fields."""
+    if hasattr(params, 'to_form'):
+        return params.to_form()
+    return dict([ (k, form_value(v)) for k, v in params.items() ])
+
+def encode_json(params):
+    """Encodes API call parameters as a compact JSON object."""
+    if hasattr(params, 'to_json'):
+        return params.to_json()
+    return '{' + ','.join([ '"%s":%s' % (k, json_value(v)) for k, v in params.items() ]) + '}'
+
+class Transport(object):
+    """
+    The way a bot performs Telegram Bot API calls.
+
+    A transport receives the bot token, the API method name, its parameters and the files to upload
+    (a dict of field names to anything accepted by ``as_input_file``) and returns the API response as
+    a Python dict, before any check on its content. It also streams the files stored by Telegram.
+    Subclasses can use any HTTP stack, or no network at all, but they must report connection failures
+    raising NetworkError.
+    """
+
+    def request(self, token, method, params=None, files=None):
+        """Performs an API call and returns the response as a Python dict."""
+        raise NotImplementedError()
+
+    def download(self, token, file_path, offset=0):
+        """
+        Returns an iterator over the chunks of the file at ``file_path``, starting from ``offset``.
+        HTTP errors are raised as ApiResponseError, and a range starting at the end of the file yields nothing.
+        """
+
+        raise NotImplementedError()
+
+    def close(self):
+        """Releases the resources held by the transport."""
+        pass
+
+class RequestsTransport(Transport):
+    """
+    A transport based on a pooled requests Session.
+
+    Connections to the API server are kept alive and reused by all the calls.
+    Parameters are sent as a compact JSON body, unless ``json_body`` is False, in which case they are
+    URL-encoded in the query string of a GET request. Calls uploading files always use multipart forms,
+    streamed from the files without loading them in memory, and downloads are streamed as well.
+    ``pool_connections`` is the number of per-host connection pools to keep, ``pool_maxsize`` is the
+    maximum number of keep-alive connections kept for each host and ``pool_block`` makes callers wait
+    for a free connection, instead of opening a throwaway one, when all of them are in use.
+    ``timeout`` is the number of seconds to wait for the server before raising a NetworkError, None to wait
+    forever; long polling ``getUpdates`` calls wait their own ``timeout`` more, so that a dropped connection
+    is never mistaken for a long poll.
+    """
+
+    def __init__(self,
+            base_url=TELEGRAM_API_URL,
+            json_body=True,
+            pool_connections=1,
+            pool_maxsize=10,
+            pool_block=False,
+            timeout=60):
+        self.base_url = base_url
+        self.json_body = json_body
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def url_for(self, token, method):
+        return "%s/bot%s/%s" % (self.base_url, token, method)
+
+    def file_url_for(self, token, file_path):
+        return "%s/file/bot%s/%s" % (self.base_url, token, file_path)
+
+    def download(self, token, file_path, offset=0):
+        headers = { 'Range': 'bytes=%d-' % (offset) } if offset else None
+        try:
+            r = self.session.get(self.file_url_for(token, file_path), headers=headers, stream=True,
+                timeout=self.timeout)
+            try:
+                if r.status_code == 416:
+                    return
+                if r.status_code >= 400:
+                    raise ApiResponseError('downloadFile', r.status_code, 'HTTP error %d' % (r.status_code))
+                skip = offset if r.status_code != 206 else 0
+                for chunk in r.iter_content(CHUNK_SIZE):
+                    if skip:
+                        chunk, skip = skip_prefix(chunk, skip)
+                    if chunk:
+                        yield chunk
+            finally:
+                r.close()
+        except requests.RequestException as e:
+            raise NetworkError('downloadFile', e)
+
+    def timeout_for(self, method, params):
+        if self.timeout is None or method != 'getUpdates' or not params or not params.get('timeout'):
+            return self.timeout
+        return self.timeout + params['timeout']
+
+    def request(self, token, method, params=None, files=None):
+        url = self.url_for(token, method)
+        timeout = self.timeout_for(method, params)
+        try:
+            if not files:
+                if not params:
+                    r = self.session.get(url, timeout=timeout)
+                elif self.json_body:
+                    r = self.session.post(url, data=encode_json(params).encode('utf-8'), headers=JSON_HEADERS,
+                        timeout=timeout)
+                else:
+                    r = self.session.get(url, params=encode_form(params), timeout=timeout)
+                return parse_response(r.text, method, r.status_code)
+            fields = encode_form(params)
+            streams = []
+            try:
+                for name, value in files.items():
+                    input_file = as_input_file(value)
+                    stream = input_file.open()
+                    streams.append(stream)
+                    fields[name] = (input_file.filename, stream, input_file.mime_type)
+                m = MultipartEncoder(fields)
+                r = self.session.post(url, data=m, headers={'Content-Type': m.content_type}, timeout=timeout)
+            finally:
+                for stream in streams:
+                    stream.close()
+            return parse_response(r.text, method, r.status_code)
+        except requests.RequestException as e:
+            raise NetworkError(method, e)
@@ -35,6 +35,62 @@ def opt_array_param(name, data, param_class):
 def opt_array_array_param(name, data, param_class):
     return None if name not in data else [ [ param_class.from_dict(p) for p in a ] for a in data[name] ]
 
+def frozen_value(value):
+    if isinstance(value, (list, tuple)):
+        return tuple([ frozen_value(v) for v in value ])
+    if isinstance(value, Freezable):
+        return value.freeze()
+    return value
+
+class Freezable(object):
+    """
+    Base class of the types sent again and again, like keyboards, which can be frozen.
+
+    ``freeze()`` returns an immutable copy of the object, whose nested objects are frozen as well and whose
+    lists become tuples. A frozen object computes its JSON once, so it can be attached to any number of calls
+    for free, it can be shared by threads, and it is hashable, being equal to the frozen objects of the same
+    type with the same JSON.
+    """
+
+    _json = None
+
+    @property
+    def frozen(self):
+        return self._json is not None
+
+    def freeze(self):
+        """Returns a frozen copy of the object, or the object itself if it is already frozen."""
+        if self._json is not None:
+            return self
+        obj = object.__new__(type(self))
+        for name, value in vars(self).items():
+            object.__setattr__(obj, name, frozen_value(value))
+        object.__setattr__(obj, '_json', obj.to_json())
+        return obj
+
+    def __setattr__(self, name, value):
+        if self._json is not None:
+            raise AttributeError("frozen %s objects cannot be changed" % (type(self).__name__))
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        if self._json is not None:
+            raise AttributeError("frozen %s objects cannot be changed" % (type(self).__name__))
+        object.__delattr__(self, name)
+
+    def __eq__(self, other):
+        if self._json is None or type(other) is not type(self) or other._json is None:
+            return self is other
+        return self._json == other._json
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        if self._json is None:
+            return object.__hash__(self)
+        return hash((type(self), self._json))
+
 class Update(object):
     """
     An incoming update.
@@ -938,7 +994,45 @@ class File(object):
         """Returns JSON string from File object."""
         return json.dumps(self.to_dict(), separators=(',',':'))
 
-class ReplyKeyboardMarkup(object):
+class ResponseParameters(object):
+    """
+    Information about why a request was unsuccessful.
+
+    For more details read the `Telegram docs <https://core.telegram.org/bots/api#responseparameters>`_.
+    """
+
+    def __init__(self,
+            migrate_to_chat_id=None,
+            retry_after=None):
+        self.migrate_to_chat_id = migrate_to_chat_id
+        self.retry_after = retry_after
+
+    def from_dict(obj_dict):
+        """Builds ResponseParameters object from Python dict."""
+        return ResponseParameters(
+                migrate_to_chat_id=opt_plain_param('migrate_to_chat_id', obj_dict),
+                retry_after=opt_plain_param('retry_after', obj_dict)
+            )
+
+    def from_json(json_str):
+        """Builds ResponseParameters object from JSON string."""
+        jdata = json.loads(json_str)
+        return ResponseParameters.from_dict(jdata)
+
+    def to_dict(self):
+        """Returns Python dict from ResponseParameters object."""
+        obj_dict = {}
+        if self.migrate_to_chat_id is not None:
+           obj_dict['migrate_to_chat_id'] = self.migrate_to_chat_id
+        if self.retry_after is not None:
+           obj_dict['retry_after'] = self.retry_after
+        return obj_dict
+
+    def to_json(self):
+        """Returns JSON string from ResponseParameters object."""
+        return json.dumps(self.to_dict(), separators=(',',':'))
+
+class ReplyKeyboardMarkup(Freezable):
     """
     A custom keyboard with reply options (see Introduction to bots for details and examples).
 
@@ -984,9 +1078,11 @@ class ReplyKeyboardMarkup(object):
 
     def to_json(self):
         """Returns JSON string from ReplyKeyboardMarkup object."""
+        if self._json is not None:
+            return self._json
         return json.dumps(self.to_dict(), separators=(',',':'))
 
-class KeyboardButton(object):
+class KeyboardButton(Freezable):
     """
     A button of the reply keyboard. Optional fields are mutually exclusive.
 
@@ -1027,9 +1123,11 @@ class KeyboardButton(object):
 
     def to_json(self):
         """Returns JSON string from KeyboardButton object."""
+        if self._json is not None:
+            return self._json
         return json.dumps(self.to_dict(), separators=(',',':'))
 
-class ReplyKeyboardHide(object):
+class ReplyKeyboardHide(Freezable):
     """
     Upon receiving a message with this object, Telegram clients will hide the current custom keyboard and display the default letter-keyboard.
 
@@ -1063,9 +1161,11 @@ class ReplyKeyboardHide(object):
 
     def to_json(self):
         """Returns JSON string from ReplyKeyboardHide object."""
+        if self._json is not None:
+            return self._json
         return json.dumps(self.to_dict(), separators=(',',':'))
 
-class InlineKeyboardMarkup(object):
+class InlineKeyboardMarkup(Freezable):
     """
     An inline keyboard that appears right next to the message it belongs to.
 
@@ -1096,9 +1196,11 @@ class InlineKeyboardMarkup(object):
 
     def to_json(self):
         """Returns JSON string from InlineKeyboardMarkup object."""
+        if self._json is not None:
+            return self._json
         return json.dumps(self.to_dict(), separators=(',',':'))
 
-class InlineKeyboardButton(object):
+class InlineKeyboardButton(Freezable):
     """
     This object represents one button of an inline keyboard. You must use exactly one of the optional fields.
 
@@ -1144,6 +1246,8 @@ class InlineKeyboardButton(object):
 
     def to_json(self):
         """Returns JSON string from InlineKeyboardButton object."""
+        if self._json is not None:
+            return self._json
         return json.dumps(self.to_dict(), separators=(',',':'))
 
 class CallbackQuery(object):
@@ -1198,7 +1302,7 @@ class CallbackQuery(object):
         """Returns JSON string from CallbackQuery object."""
         return json.dumps(self.to_dict(), separators=(',',':'))
 
-class ForceReply(object):
+class ForceReply(Freezable):
     """
     Upon receiving a message with this object, Telegram clients will display a reply interface to the user (act as if the user has selected the bot‘s message and tapped ’Reply').
 
@@ -1232,6 +1336,8 @@ class ForceReply(object):
 
     def to_json(self):
         """Returns JSON string from ForceReply object."""
+        if self._json is not None:
+            return self._json
         return json.dumps(self.to_dict(), separators=(',',':'))
 
 class InlineQuery(object):
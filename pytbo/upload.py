@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.upload
+~~~~~~~~~~~~
+
+This module implements the files uploaded to the Telegram Bots API.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import collections
+import hashlib
+import io
+import mimetypes
+import os
+import threading
+
+CHUNK_SIZE = 64 * 1024
+
+def as_input_file(value):
+    """Returns the given value as an InputFile."""
+    return value if isinstance(value, InputFile) else InputFile(value)
+
+class InputFile(object):
+    """
+    A file to upload, read from a path, a binary file object or a buffer, like bytes, a memoryview or an mmap.
+
+    The content is never loaded as a whole: every attempt to send the file reads it in bounded chunks through
+    a new UploadStream, returned by ``open``, so that retried calls send the file again from its start.
+    Files opened from a path are closed as soon as the request is over, while file objects and buffers belong
+    to the caller and are left open. A file object is sent from its position when the InputFile is created,
+    so it cannot be shared by concurrent uploads; if it is not seekable, it is read in memory once.
+    ``progress``, if given, is called with the number of bytes sent so far and the total size of the file.
+    """
+
+    def __init__(self, source, filename=None, mime_type=None, progress=None):
+        self.source = source
+        self.progress = progress
+        self.path = None
+        self.__start = 0
+        self.__data = None
+        if isinstance(source, (str, os.PathLike)):
+            self.path = os.fspath(source)
+            name = self.path
+        elif hasattr(source, 'read'):
+            if hasattr(source, 'seekable') and source.seekable():
+                self.__start = source.tell()
+            name = getattr(source, 'name', None)
+        else:
+            with memoryview(source):
+                pass
+            name = None
+        if filename is None:
+            filename = os.path.basename(name) if isinstance(name, str) else 'file'
+        if mime_type is None:
+            mime_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        self.filename = filename
+        self.mime_type = mime_type
+
+    def open(self):
+        """Returns a new UploadStream reading the file from its start. It must be closed by the caller."""
+        return self.__open(self.progress)
+
+    def digest(self, algorithm='sha256'):
+        """Returns the hex digest of the file content, read in chunks without loading it in memory."""
+        h = hashlib.new(algorithm)
+        if self.path is None and not hasattr(self.source, 'read'):
+            with memoryview(self.source) as view:
+                h.update(view)
+            return h.hexdigest()
+        buf = bytearray(CHUNK_SIZE)
+        with memoryview(buf) as view, self.__open(None) as stream:
+            size = stream.readinto(buf)
+            while size:
+                h.update(view[:size])
+                size = stream.readinto(buf)
+        return h.hexdigest()
+
+    def __open(self, progress):
+        if self.path is not None:
+            fileobj = open(self.path, 'rb')
+            return UploadStream(fileobj, size=os.fstat(fileobj.fileno()).st_size, owned=True, progress=progress)
+        if not hasattr(self.source, 'read'):
+            return UploadStream(view=memoryview(self.source).cast('B'), progress=progress)
+        if hasattr(self.source, 'seekable') and self.source.seekable():
+            end = self.source.seek(0, io.SEEK_END)
+            self.source.seek(self.__start)
+            return UploadStream(self.source, self.__start, end - self.__start, progress=progress)
+        if self.__data is None:
+            self.__data = self.source.read()
+        return UploadStream(view=memoryview(self.__data), progress=progress)
+
+class UploadStream(io.RawIOBase):
+    """
+    A seekable, read-only stream over the content of an InputFile, used for a single upload.
+    Its length is known in advance, so that requests get a Content-Length instead of a chunked body.
+    """
+
+    def __init__(self, fileobj=None, start=0, size=None, view=None, owned=False, progress=None):
+        super(UploadStream, self).__init__()
+        self.__fileobj = fileobj
+        self.__start = start
+        self.__view = view
+        self.__size = len(view) if view is not None else size
+        self.__owned = owned
+        self.__progress = progress
+        self.__pos = 0
+
+    def __len__(self):
+        return self.__size
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.__pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.__pos
+        elif whence == io.SEEK_END:
+            offset += self.__size
+        self.__pos = min(max(offset, 0), self.__size)
+        if self.__fileobj is not None:
+            self.__fileobj.seek(self.__start + self.__pos)
+        return self.__pos
+
+    def readinto(self, b):
+        size = min(len(b), self.__size - self.__pos)
+        if size <= 0:
+            return 0
+        if self.__view is not None:
+            b[:size] = self.__view[self.__pos:self.__pos + size]
+        elif hasattr(self.__fileobj, 'readinto'):
+            size = self.__fileobj.readinto(memoryview(b)[:size])
+        else:
+            data = self.__fileobj.read(size)
+            size = len(data)
+            b[:size] = data
+        self.__pos += size
+        if self.__progress is not None:
+            self.__progress(self.__pos, self.__size)
+        return size
+
+    def close(self):
+        if not self.closed:
+            if self.__view is not None:
+                self.__view.release()
+            if self.__owned:
+                self.__fileobj.close()
+        super(UploadStream, self).close()
+
+class UploadCache(object):
+    """
+    Remembers the file_id Telegram gives to the uploaded files, so that sending the same content again
+    only sends its id.
+
+    Files are identified by a SHA-256 digest of their content, computed reading them in chunks; the digest
+    of a file given by path is reused as long as its size and modification time do not change. The cache
+    keeps the ``max_size`` most recently used ids in memory and, if ``path`` is given, appends them to an
+    index file, which is loaded on creation. File ids are only valid for the bot that uploaded the files,
+    so every bot must use its own index.
+    """
+
+    def __init__(self, max_size=1024, path=None):
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.__ids = collections.OrderedDict()
+        self.__digests = collections.OrderedDict()
+        self.__index_lines = 0
+        self.__lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            with open(path, 'r') as index:
+                for line in index:
+                    self.__index_lines += 1
+                    fields = line.rstrip('\n').split('\t')
+                    if len(fields) == 2:
+                        self.__store(fields[0], fields[1])
+
+    def __len__(self):
+        return len(self.__ids)
+
+    def key(self, field, value):
+        """Returns the cache key of a file sent as the given field (e.g. 'photo')."""
+        input_file = as_input_file(value)
+        if input_file.path is None:
+            return '%s:%s' % (field, input_file.digest())
+        st = os.stat(input_file.path)
+        signature = (input_file.path, st.st_size, st.st_mtime_ns, st.st_ino)
+        with self.__lock:
+            digest = self.__digests.get(signature)
+        if digest is None:
+            digest = input_file.digest()
+            with self.__lock:
+                self.__digests[signature] = digest
+                if len(self.__digests) > self.max_size:
+                    self.__digests.popitem(last=False)
+        return '%s:%s' % (field, digest)
+
+    def get(self, key):
+        with self.__lock:
+            file_id = self.__ids.get(key)
+            if file_id is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.__ids.move_to_end(key)
+            return file_id
+
+    def put(self, key, file_id):
+        with self.__lock:
+            if self.__ids.get(key) == file_id:
+                return
+            self.__store(key, file_id)
+            if self.path is not None:
+                if self.__index_lines > 2 * self.max_size:
+                    self.__compact()
+                else:
+                    with open(self.path, 'a') as index:
+                        index.write('%s\t%s\n' % (key, file_id))
+                    self.__index_lines += 1
+
+    def discard(self, keys):
+        """Forgets the given keys, e.g. because Telegram refused their file ids."""
+        with self.__lock:
+            for key in keys:
+                self.__ids.pop(key, None)
+            if self.path is not None:
+                self.__compact()
+
+    def resolve(self, params, files):
+        """
+        Replaces the files already uploaded with their file_id.
+
+        Returns the new parameters and files, a dict of the fields still to upload to their keys and
+        a dict of the fields replaced by a cached file_id to their keys.
+        """
+
+        params = dict(params)
+        files = dict(files)
+        uploads = {}
+        hits = {}
+        for field, value in list(files.items()):
+            files[field] = value = as_input_file(value)
+            key = self.key(field, value)
+            file_id = self.get(key)
+            if file_id is None:
+                uploads[field] = key
+            else:
+                hits[field] = key
+                params[field] = file_id
+                del files[field]
+        return params, files, uploads, hits
+
+    def record(self, result, uploads):
+        """Stores the file ids found in the Message (as a dict) returned by an upload."""
+        if not isinstance(result, dict):
+            return
+        for field, key in uploads.items():
+            media = result.get(field)
+            if isinstance(media, list):
+                media = media[-1] if media else None
+            if isinstance(media, dict) and 'file_id' in media:
+                self.put(key, media['file_id'])
+
+    def __store(self, key, file_id):
+        self.__ids[key] = file_id
+        self.__ids.move_to_end(key)
+        if len(self.__ids) > self.max_size:
+            self.__ids.popitem(last=False)
+
+    def __compact(self):
+        tmp_path = '%s.tmp' % (self.path)
+        with open(tmp_path, 'w') as index:
+            for key, file_id in self.__ids.items():
+                index.write('%s\t%s\n' % (key, file_id))
+        os.replace(tmp_path, self.path)
+        self.__index_lines = len(self.__ids)
@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+
+"""
+pytbo.webhook
+~~~~~~~~~~~~~
+
+This module implements a lightweight asyncio HTTP server receiving the updates of a bot through a webhook,
+and the API calls made in its responses.
+
+:copyright: (c) 2016 by Alessandro Costa.
+:license: Apache2, see LICENSE for more details.
+
+"""
+
+import asyncio
+import inspect
+
+from .errors import ApiRequestError
+from .methods import METHODS
+from .transport import encode_json
+from .types import Update
+
+MAX_HEADER_SIZE = 16 * 1024
+
+REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    411: 'Length Required',
+    413: 'Payload Too Large',
+    431: 'Request Header Fields Too Large',
+    501: 'Not Implemented',
+    503: 'Service Unavailable'
+}
+
+def http_response(status, keep_alive=True):
+    """Returns an HTTP/1.1 response with the given status and no body."""
+    headers = [ 'HTTP/1.1 %d %s' % (status, REASONS[status]), 'Content-Length: 0' ]
+    if status == 405:
+        headers.append('Allow: POST')
+    if not keep_alive:
+        headers.append('Connection: close')
+    return ('\r\n'.join(headers) + '\r\n\r\n').encode('ascii')
+
+RESPONSES = dict(((status, keep_alive), http_response(status, keep_alive))
+    for status in REASONS for keep_alive in (True, False))
+
+class Reply(object):
+    """
+    An API call made in the response to a webhook request, built with the same arguments as the bot
+    method with the given name:
+
+        return Reply('sendMessage', update.message.chat.id, 'Hello!')
+
+    Telegram makes the call without telling its result, or its error, to the bot. Calls uploading files
+    cannot be made in a response, so they are always made by the bot.
+    """
+
+    def __init__(self, method, *args, **kwargs):
+        spec = METHODS.get(method)
+        if spec is None:
+            raise ApiRequestError("'%s' is not an API method" % (method))
+        self.method = method
+        self.endpoint = spec.endpoint
+        self.decode = spec.decode
+        self.params, self.files = spec.encode(*args, **kwargs)
+
+    def to_json(self):
+        """Returns the body of a webhook response making the call."""
+        params = encode_json(self.params)
+        return '{"method":"%s"%s%s' % (self.endpoint, ',' if len(params) > 2 else '', params[1:])
+
+    def send(self, bot):
+        """Makes the call through the given bot, returning what the bot method returns."""
+        return bot._call(self.endpoint, self.params, self.files, self.decode)
+
+class WebhookProtocol(asyncio.Protocol):
+    """A connection to a WebhookServer, which can carry any number of requests."""
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buffer = bytearray()
+        self.last_active = 0
+        self.pending = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.last_active = self.server.loop.time()
+        self.server.connections.add(self)
+
+    def connection_lost(self, exc):
+        self.server.connections.discard(self)
+        self.transport = None
+
+    def data_received(self, data):
+        self.buffer += data
+        self.last_active = self.server.loop.time()
+        self.process()
+
+    def process(self):
+        while self.transport is not None and self.pending is None:
+            end = self.buffer.find(b'\r\n\r\n')
+            if end < 0:
+                if len(self.buffer) > MAX_HEADER_SIZE:
+                    self.respond(431, False)
+                return
+            try:
+                lines = self.buffer[:end].decode('latin-1').split('\r\n')
+                method, target, version = lines[0].split(' ')
+                headers = {}
+                for line in lines[1:]:
+                    name, sep, value = line.partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+            except ValueError:
+                self.respond(400, False)
+                return
+            if length < 0:
+                self.respond(400, False)
+                return
+            if 'transfer-encoding' in headers:
+                self.respond(501 if headers['transfer-encoding'].lower() != 'chunked' else 411, False)
+                return
+            if length > self.server.max_body:
+                self.respond(413, False)
+                return
+            if len(self.buffer) < end + 4 + length:
+                return
+            body = bytes(self.buffer[end + 4:end + 4 + length])
+            del self.buffer[:end + 4 + length]
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+            status = self.server.receive(method, target, body)
+            if isinstance(status, int):
+                self.respond(status, keep_alive)
+            else:
+                self.pending = status
+                status.add_done_callback(lambda response: self.reply(response.result(), keep_alive))
+
+    def respond(self, status, keep_alive=True):
+        self.transport.write(RESPONSES[(status, keep_alive)])
+        if not keep_alive:
+            self.transport.close()
+            self.transport = None
+
+    def reply(self, body, keep_alive=True):
+        """Sends a delayed response, with the given JSON body or none, and goes on with the next request."""
+        self.pending = None
+        if self.transport is None:
+            return
+        if body is None:
+            self.respond(200, keep_alive)
+        else:
+            head = 'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n%s\r\n' % (
+                len(body), '' if keep_alive else 'Connection: close\r\n')
+            self.transport.write(head.encode('ascii') + body)
+            if not keep_alive:
+                self.transport.close()
+                self.transport = None
+        self.process()
+
+class WebhookServer(object):
+    """
+    A dependency-free asyncio HTTP/1.1 server receiving the updates that Telegram POSTs to a webhook.
+
+    Every update is acknowledged as soon as it is decoded with ``Update.from_json``, before any handler
+    runs, and it is queued for the handlers, which get it iterating over the server with ``async for``
+    or through ``run()``. Connections are kept alive, so Telegram does not pay a new handshake for every
+    update, and closed after ``keepalive_timeout`` idle seconds.
+
+    Only POSTs to ``path`` are accepted: use a secret path, like the bot token, so that nobody else can
+    post fake updates, and pass it to ``setWebhook``. ``ssl`` is an optional ``ssl.SSLContext``, for a
+    server directly reachable by Telegram rather than behind a reverse proxy. At most ``max_queue`` updates
+    are queued: when the handlers fall behind, the server answers 503 and Telegram sends the updates again
+    later. Bodies larger than ``max_body`` bytes are refused. ``reuse_port`` lets other processes listen
+    on the same port, with the kernel spreading the connections among them (see WebhookSupervisor).
+
+    Alternatively, ``serve()`` runs a handler for every update as soon as it arrives, holding the response
+    until the handler ends, so that the handler can return a Reply to make an API call in the response.
+    """
+
+    def __init__(self,
+            host='0.0.0.0',
+            port=8443,
+            path='/',
+            ssl=None,
+            max_queue=10000,
+            max_body=1024 * 1024,
+            keepalive_timeout=75,
+            reuse_port=False):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.ssl = ssl
+        self.max_queue = max_queue
+        self.max_body = max_body
+        self.keepalive_timeout = keepalive_timeout
+        self.reuse_port = reuse_port
+        self.loop = None
+        self.queue = None
+        self.connections = set()
+        self.received = 0
+        self.rejected = 0
+        self.replied = 0
+        self.sent = 0
+        self.late = 0
+        self.bot = None
+        self.reply_timeout = None
+        self.__handler = None
+        self.__tasks = set()
+        self.__server = None
+        self.__sweeper = None
+        self.__stopped = False
+        self.__getter = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def start(self):
+        """Starts listening. If ``port`` is 0, a free port is chosen and ``port`` is set to it."""
+        self.loop = asyncio.get_event_loop()
+        self.queue = asyncio.Queue(self.max_queue)
+        self.__stopped = False
+        self.__server = await self.loop.create_server(lambda: WebhookProtocol(self), self.host, self.port,
+            ssl=self.ssl, reuse_address=True, reuse_port=self.reuse_port or None, backlog=1024)
+        self.port = self.__server.sockets[0].getsockname()[1]
+        self.__sweeper = self.loop.call_later(self.keepalive_timeout, self.__sweep)
+
+    def stop(self):
+        """
+        Stops accepting updates. The iteration over the server ends once the updates already
+        acknowledged are handed out.
+        """
+
+        self.__stopped = True
+        if self.__server is not None:
+            self.__server.close()
+        if self.__getter is not None:
+            self.__getter.cancel()
+
+    async def close(self):
+        """Stops the server and closes all its connections."""
+        self.stop()
+        if self.__sweeper is not None:
+            self.__sweeper.cancel()
+            self.__sweeper = None
+        for connection in list(self.connections):
+            if connection.transport is not None:
+                connection.transport.close()
+        if self.__server is not None:
+            await self.__server.wait_closed()
+            self.__server = None
+
+    def stats(self):
+        """Returns the counters of the server as a dict."""
+        return {
+            'received': self.received,
+            'rejected': self.rejected,
+            'replied': self.replied,
+            'sent': self.sent,
+            'late': self.late,
+            'connections': len(self.connections),
+            'queued': 0 if self.queue is None else self.queue.qsize(),
+            'handling': len(self.__tasks)
+        }
+
+    def receive(self, method, target, body):
+        """Handles a request, returning the HTTP status of the response or a future of the body of a delayed one."""
+        if target.split('?', 1)[0] != self.path:
+            return 404
+        if method != 'POST':
+            return 405
+        if self.__stopped:
+            self.rejected += 1
+            return 503
+        try:
+            update = Update.from_json(body.decode('utf-8'))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return 400
+        if self.__handler is not None:
+            if len(self.__tasks) >= self.max_queue:
+                self.rejected += 1
+                return 503
+            self.received += 1
+            return self.__dispatch(update)
+        if self.queue.full():
+            self.rejected += 1
+            return 503
+        self.received += 1
+        self.queue.put_nowait(update)
+        return 200
+
+    async def __aiter__(self):
+        while not (self.__stopped and self.queue.empty()):
+            if not self.queue.empty():
+                yield self.queue.get_nowait()
+                continue
+            self.__getter = asyncio.ensure_future(self.queue.get())
+            try:
+                update = await self.__getter
+            except asyncio.CancelledError:
+                if not self.__stopped:
+                    raise
+                continue
+            finally:
+                self.__getter = None
+            yield update
+
+    async def run(self, handler):
+        """Calls ``handler(update)``, awaiting it if it is a coroutine function, for every update, until ``stop()`` is called."""
+        async for update in self:
+            result = handler(update)
+            if inspect.isawaitable(result):
+                await result
+
+    async def serve(self, handler, bot, reply_timeout=1.0):
+        """
+        Calls ``handler(update)``, awaiting it if it is a coroutine function, for every update as soon as it
+        arrives, until ``stop()`` is called; then waits for the running handlers.
+
+        If the handler returns a Reply within ``reply_timeout`` seconds, the call is made in the response,
+        saving a request to the API servers. Otherwise the response is sent at the deadline, so that Telegram
+        does not wait for slow handlers, and the Reply returned later is sent through ``bot``: an AsyncBareBot,
+        or a BareBot whose calls run in the default executor. Errors of the handlers and of the calls made by
+        the bot are reported to the exception handler of the event loop.
+        """
+
+        self.bot = bot
+        self.reply_timeout = reply_timeout
+        self.__handler = handler
+        try:
+            async for update in self:
+                self.__track(self.loop.create_task(self.__handle(update)), self.__handled)
+        finally:
+            self.__handler = None
+        while self.__tasks:
+            await asyncio.wait(list(self.__tasks))
+
+    def __track(self, task, callback):
+        self.__tasks.add(task)
+        task.add_done_callback(callback)
+
+    def __dispatch(self, update):
+        response = self.loop.create_future()
+        timer = self.loop.call_later(self.reply_timeout, self.__expire, response)
+        self.__track(self.loop.create_task(self.__handle(update)), lambda task: self.__handled(task, response, timer))
+        return response
+
+    async def __handle(self, update):
+        result = self.__handler(update)
+        if inspect.isawaitable(result):
+            result = await result
+        return result if isinstance(result, Reply) else None
+
+    def __expire(self, response):
+        if not response.done():
+            self.late += 1
+            response.set_result(None)
+
+    def __handled(self, task, response=None, timer=None):
+        self.__tasks.discard(task)
+        if timer is not None:
+            timer.cancel()
+        reply = self.__result(task, 'webhook handler failed')
+        if response is not None and not response.done():
+            if reply is not None and not reply.files:
+                self.replied += 1
+                response.set_result(reply.to_json().encode('utf-8'))
+                return
+            response.set_result(None)
+        if reply is not None:
+            self.sent += 1
+            if inspect.iscoroutinefunction(self.bot._call):
+                call = self.loop.create_task(reply.send(self.bot))
+            else:
+                call = asyncio.ensure_future(self.loop.run_in_executor(None, reply.send, self.bot))
+            self.__track(call, self.__sent)
+
+    def __sent(self, task):
+        self.__tasks.discard(task)
+        self.__result(task, 'webhook reply failed')
+
+    def __result(self, task, message):
+        if task.cancelled():
+            return None
+        if task.exception() is not None:
+            self.loop.call_exception_handler({ 'message': message, 'exception': task.exception(), 'task': task })
+            return None
+        return task.result()
+
+    def __sweep(self):
+        deadline = self.loop.time() - self.keepalive_timeout
+        for connection in list(self.connections):
+            if connection.last_active < deadline and connection.transport is not None:
+                connection.transport.close()
+        self.__sweeper = self.loop.call_later(self.keepalive_timeout / 2.0, self.__sweep)
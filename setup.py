@@ -13,6 +13,10 @@ install_requires = [
     "requests-toolbelt >=0.6.0,<0.7.0"
 ]
 
+extras_require = {
+    "async": [ "aiohttp >=1.0.0" ]
+}
+
 setup(
     name='pytbo',
     version=version,
@@ -23,6 +27,8 @@ setup(
     url='https://github.com/kostola/pytbo',
     packages=[ 'pytbo' ],
     install_requires=install_requires,
+    extras_require=extras_require,
+    python_requires='>=3.7',
     license='Apache 2.0',
     classifiers=(
         'Development Status :: 3 - Alpha',
@@ -30,10 +36,8 @@ setup(
         'Natural Language :: English',
         'License :: OSI Approved :: Apache Software License',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5'
+        'Programming Language :: Python :: 3 :: Only',
+        'Programming Language :: Python :: 3.7'
     )
 )